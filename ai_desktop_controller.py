@@ -6,22 +6,30 @@ Allows AI to take screenshots, analyze desktop, and perform real actions.
 
 import os
 import sys
+import copy
+import asyncio
 import time
 import json
 import base64
 import logging
+from io import BytesIO
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
 from dataclasses import dataclass
 from pathlib import Path
 import threading
 import queue
+import collections
+import atexit
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # External dependencies
 try:
     import openai
+    import httpx
     import pyautogui
     import cv2
+    import mss
     import numpy as np
     from PIL import Image, ImageDraw, ImageFont
     import pynput
@@ -30,9 +38,104 @@ try:
     import subprocess
 except ImportError as e:
     print(f"Missing required dependency: {e}")
-    print("Install with: pip install openai pyautogui opencv-python pillow pynput psutil")
+    print("Install with: pip install openai 'httpx[http2]' pyautogui opencv-python mss pillow pynput psutil")
     sys.exit(1)
 
+# Optional faster JSON parsing/serialization
+try:
+    import orjson
+    json_loads = orjson.loads
+
+    def json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+# HTTP/2 for the OpenAI connection pool needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+OPENAI_POOL_LIMITS = httpx.Limits(max_keepalive_connections=8, max_connections=16)
+
+_DEFAULT_CONFIG = {
+    "openai": {
+        "api_key": "",
+        "model": "gpt-4o-mini",
+        "max_tokens": 1000,
+        "temperature": 0.1,
+        "timeout": 30
+    },
+    "desktop": {
+        "screenshot_quality": 85,
+        "max_screenshot_size": [1920, 1080],
+        "click_delay": 0.1,
+        "type_delay": 0.05,
+        "safety_mode": True,
+        "save_screenshots": False
+    },
+    "ai": {
+        "autonomous_mode": False,
+        "decision_interval": 3.0,
+        "max_thinking_time": 10.0,
+        "confidence_threshold": 0.7,
+        "max_concurrent_requests": 2,
+        "skip_unchanged_frames": True
+    }
+}
+
+
+def _ping_openai(client: "openai.OpenAI") -> None:
+    """Minimal chat completion used as a connection/API-key health check"""
+    client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": "Hello"}],
+        max_tokens=5
+    )
+
+
+def deep_merge(base: Dict, override: Dict) -> Dict:
+    """Recursively merge override into base (in place) and return base"""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            deep_merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+_SYSTEM_PROMPT = """You are an AI assistant that can see and control a Linux desktop. You can:
+1. Click on buttons, icons, menus, and UI elements
+2. Type text into input fields
+3. Navigate applications and windows
+4. Scroll through content
+5. Press keyboard shortcuts
+
+When analyzing the screen, provide:
+- What you can see on the desktop
+- Identify interactive elements (buttons, text fields, menus, etc.)
+- Suggest the next logical action based on the task
+- Provide exact coordinates for any actions
+
+Respond in JSON format with this structure:
+{
+    "analysis": "Description of what you see",
+    "elements": [{"type": "button/textfield/icon/etc", "text": "label", "x": 100, "y": 200, "confidence": 0.9}],
+    "suggested_action": {
+        "type": "click/type/key_press/scroll",
+        "x": 100,
+        "y": 200,
+        "text": "text to type (if applicable)",
+        "key": "key to press (if applicable)",
+        "reasoning": "Why this action makes sense"
+    }
+}"""
+
 @dataclass
 class DesktopAction:
     """Represents an action to be performed on the desktop"""
@@ -60,21 +163,37 @@ class AIDesktopController:
         self.config_path = config_path
         self.config = self.load_config()
         self.setup_logging()
+        self._screenshot_dir = Path("screenshots")
+        self._screenshot_dir.mkdir(exist_ok=True)
+        self._sys_msg = {"role": "system", "content": _SYSTEM_PROMPT}
         self.setup_openai()
         self.setup_automation()
 
         # State management
         self.is_running = False
         self.current_screenshot = None
+        self.current_frame = None
+        self._data_url_cache = (None, None)
+        self._gray_cache = (None, None)
         self.last_screenshot_time = 0
         self.action_queue = queue.Queue()
-        self.screen_history = []
+        self._save_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot-save")
+        atexit.register(self._save_pool.shutdown, wait=True)
+        self._jpeg_buf = BytesIO()
+        self._jpeg_lock = threading.Lock()
+        self.screen_history_size = 8
+        self.screen_history = collections.deque(maxlen=self.screen_history_size)
+        self._frame_pool: List[np.ndarray] = []
+        self._pool_idx = 0
         self.interaction_count = 0
 
         # Safety limits
         self.max_actions_per_minute = 30
-        self.action_timestamps = []
+        self.action_timestamps = collections.deque(maxlen=self.max_actions_per_minute)
         self.screenshot_interval = 2.0  # seconds
+        self.window_cache_ttl = 0.5  # seconds
+        self.idle_backoff_max = 4.0  # cap, in multiples of decision_interval
+        self._win_cache = (float("-inf"), [])
 
         # Desktop state
         self.screen_size = pyautogui.size()
@@ -85,48 +204,24 @@ class AIDesktopController:
 
     def load_config(self) -> Dict:
         """Load configuration from file"""
-        default_config = {
-            "openai": {
-                "api_key": "",
-                "model": "gpt-4-vision-preview",
-                "max_tokens": 1000,
-                "temperature": 0.1
-            },
-            "desktop": {
-                "screenshot_quality": 85,
-                "max_screenshot_size": [1920, 1080],
-                "click_delay": 0.1,
-                "type_delay": 0.05,
-                "safety_mode": True
-            },
-            "ai": {
-                "autonomous_mode": False,
-                "decision_interval": 3.0,
-                "max_thinking_time": 10.0,
-                "confidence_threshold": 0.7
-            }
-        }
+        config = copy.deepcopy(_DEFAULT_CONFIG)
 
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, 'r') as f:
-                    user_config = json.load(f)
-                    # Merge with defaults
-                    for section, values in user_config.items():
-                        if section in default_config:
-                            default_config[section].update(values)
-                        else:
-                            default_config[section] = values
-            except Exception as e:
-                print(f"Error loading config: {e}")
-        else:
+        try:
+            raw = Path(self.config_path).read_bytes()
+        except FileNotFoundError:
             # Create default config file
-            with open(self.config_path, 'w') as f:
-                json.dump(default_config, f, indent=2)
+            Path(self.config_path).write_bytes(json_dumps(config))
             print(f"Created default config file: {self.config_path}")
             print("Please add your OpenAI API key to the config file!")
+            return config
+
+        try:
+            # Merge with defaults
+            deep_merge(config, json_loads(raw))
+        except Exception as e:
+            print(f"Error loading config: {e}")
 
-        return default_config
+        return config
 
     def setup_logging(self):
         """Setup logging configuration"""
@@ -155,25 +250,43 @@ class AIDesktopController:
             print('   "openai": { "api_key": "sk-your-key-here" }')
             sys.exit(1)
 
-        openai.api_key = api_key
-        self.openai_client = openai
-
-        # Test connection
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": "Hello"}],
-                max_tokens=5
+        # One pooled keep-alive client shared by the health check and every analysis
+        self.openai_client = openai.OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=OPENAI_POOL_LIMITS,
+                timeout=self.config["openai"].get("timeout", 30.0)
             )
+        )
+
+        # Test connection in the background while the rest of startup proceeds
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="openai-check")
+        self._oai_check = executor.submit(_ping_openai, self.openai_client)
+        self._oai_check.add_done_callback(self._log_openai_check)
+        executor.shutdown(wait=False)
+
+    def _log_openai_check(self, future: Future):
+        """Report the outcome of the background OpenAI health check"""
+        error = future.exception()
+        if error is None:
             self.logger.info("✅ OpenAI connection successful")
-        except Exception as e:
-            self.logger.error(f"❌ OpenAI connection failed: {e}")
-            sys.exit(1)
+        else:
+            self.logger.error(f"❌ OpenAI connection failed: {error}")
+
+    def _wait_for_openai(self):
+        """Block until the startup health check is done; raises once if it failed"""
+        check = self._oai_check
+        if check is not None:
+            self._oai_check = None
+            check.result()
 
     def setup_automation(self):
         """Setup desktop automation tools"""
-        # Configure pyautogui
-        pyautogui.PAUSE = self.config["desktop"]["click_delay"]
+        # Configure pyautogui; pacing is handled by the action deadline instead
+        pyautogui.PAUSE = 0
+        self._next_action_deadline = 0.0
+        self.refresh_config_cache()
         pyautogui.FAILSAFE = True  # Move mouse to corner to stop
 
         # Disable fail-safe for headless environments if needed
@@ -182,79 +295,187 @@ class AIDesktopController:
         else:
             pyautogui.FAILSAFE = False
 
+        # One persistent mss capturer per thread: mss keeps its X display handle
+        # thread-local, but reusing it per thread keeps XShm buffers across grabs
+        self._sct_local = threading.local()
+        self._mon = self._grabber().monitors[1]
+
+    def _grabber(self):
+        """Return the calling thread's mss instance, creating it on first use"""
+        sct = getattr(self._sct_local, "sct", None)
+        if sct is None:
+            sct = self._sct_local.sct = mss.mss()
+        return sct
+
+    def refresh_config_cache(self):
+        """Bind hot-path desktop settings to attributes; call again after editing config"""
+        desktop = self.config["desktop"]
+        self._min_action_gap = desktop["click_delay"]
+        self._max_ss_size = tuple(desktop["max_screenshot_size"])
+        self._ss_quality = desktop["screenshot_quality"]
+        self._type_delay = desktop["type_delay"]
+        self._save_screenshots = bool(desktop.get("save_screenshots"))
+        self._resample = cv2.INTER_AREA
+
+    def _next_frame_slot(self, size: Tuple[int, int]) -> np.ndarray:
+        """Return the next preallocated BGR buffer from the history ring"""
+        shape = (size[0], size[1], 3)
+        if not self._frame_pool or self._frame_pool[0].shape != shape:
+            self._frame_pool = [np.empty(shape, np.uint8) for _ in range(self.screen_history_size)]
+            self._pool_idx = 0
+
+        slot = self._frame_pool[self._pool_idx]
+        self._pool_idx = (self._pool_idx + 1) % self.screen_history_size
+        return slot
+
     def take_screenshot(self, region: Optional[Tuple[int, int, int, int]] = None) -> Image.Image:
         """Take a screenshot of the desktop"""
+        return self.take_screenshot_with_hash(region)[0]
+
+    def take_screenshot_with_hash(self, region: Optional[Tuple[int, int, int, int]] = None) -> Tuple[Image.Image, int]:
+        """Take a screenshot, along with a cheap fingerprint for change detection"""
         try:
             if region:
-                screenshot = pyautogui.screenshot(region=region)
+                left, top, width, height = region
+                monitor = {"left": left, "top": top, "width": width, "height": height}
             else:
-                screenshot = pyautogui.screenshot()
+                monitor = self._mon
 
-            # Resize if too large
-            max_size = tuple(self.config["desktop"]["max_screenshot_size"])
-            if screenshot.size[0] > max_size[0] or screenshot.size[1] > max_size[1]:
-                screenshot.thumbnail(max_size, Image.Resampling.LANCZOS)
+            raw = self._grabber().grab(monitor)
+            frame = np.frombuffer(raw.raw, dtype=np.uint8).reshape(raw.height, raw.width, 4)
 
+            # Resize if too large
+            max_w, max_h = self._max_ss_size
+            h, w = frame.shape[:2]
+            scale = min(max_w / w, max_h / h, 1.0)
+            if scale < 1.0:
+                frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=self._resample)
+
+            # Keep the BGR frame for cv2 consumers; build the PIL view only once
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=self._next_frame_slot(frame.shape[:2]))
+            self.screen_history.append(frame)
+            h, w = frame.shape[:2]
+            screenshot = Image.frombuffer("RGB", (w, h), frame, "raw", "BGR", 0, 1)
+
+            # Cheap fingerprint of a 32x32 grayscale thumbnail for change detection
+            thumb = cv2.cvtColor(cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            frame_hash = hash(thumb.tobytes())
+
+            self.current_frame = frame
             self.current_screenshot = screenshot
             self.last_screenshot_time = time.time()
 
-            # Save screenshot with timestamp
-            screenshot_dir = Path("screenshots")
-            screenshot_dir.mkdir(exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-            screenshot_path = screenshot_dir / f"screen_{timestamp}.png"
-            screenshot.save(screenshot_path)
+            # Save screenshot with timestamp (off the hot path)
+            if self._save_screenshots:
+                screenshot_path = self._screenshot_dir / f"screen_{int(self.last_screenshot_time * 1000)}.png"
+                self._save_pool.submit(screenshot.save, screenshot_path, optimize=False, compress_level=1)
 
-            self.logger.info(f"Screenshot taken: {screenshot.size}")
-            return screenshot
+            self.logger.debug("Screenshot taken: %s", screenshot.size)
+            return screenshot, frame_hash
 
         except Exception as e:
             self.logger.error(f"Failed to take screenshot: {e}")
             raise
 
-    def encode_image_for_openai(self, image: Image.Image) -> str:
-        """Encode image for OpenAI API"""
-        from io import BytesIO
+    def _match_gray(self) -> np.ndarray:
+        """Grayscale, half-size copy of the current frame, computed once per capture"""
+        if self.current_frame is None:
+            self.take_screenshot()
 
-        buffer = BytesIO()
-        image.save(buffer, format="PNG", quality=self.config["desktop"]["screenshot_quality"])
-        image_data = buffer.getvalue()
-        return base64.b64encode(image_data).decode('utf-8')
+        captured_at, gray = self._gray_cache
+        if gray is not None and captured_at == self.last_screenshot_time:
+            return gray
+
+        captured_at = self.last_screenshot_time
+        gray = cv2.cvtColor(self.current_frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.resize(gray, (gray.shape[1] // 2, gray.shape[0] // 2), interpolation=cv2.INTER_AREA)
+        self._gray_cache = (captured_at, gray)
+        return gray
+
+    def find_elements(self, templates: List[np.ndarray], threshold: Optional[float] = None,
+                      max_hits: int = 20) -> List[ScreenElement]:
+        """Locate template images (BGR or grayscale) in the current frame.
+
+        Matching runs once per template with cv2.TM_CCOEFF_NORMED on a half-size
+        grayscale copy of the frame. Bounds are in current-frame pixel coordinates.
+        """
+        if threshold is None:
+            threshold = self.config["ai"]["confidence_threshold"]
+
+        gray = self._match_gray()
+        elements: List[ScreenElement] = []
+
+        for index, template in enumerate(templates):
+            if template.ndim == 3:
+                template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+            th, tw = template.shape[0] // 2, template.shape[1] // 2
+            if th < 1 or tw < 1 or th > gray.shape[0] or tw > gray.shape[1]:
+                continue
+            template = cv2.resize(template, (tw, th), interpolation=cv2.INTER_AREA)
 
-    def analyze_screen_with_ai(self, task: str = "analyze", additional_context: str = "") -> Dict[str, Any]:
-        """Analyze current screen using OpenAI Vision"""
-        if not self.current_screenshot:
+            result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+            ys, xs = np.where(result > threshold)
+            if not len(xs):
+                continue
+
+            # Strongest hits first; drop hits overlapping an already accepted one
+            scores = result[ys, xs]
+            accepted: List[Tuple[int, int]] = []
+            for i in np.argsort(scores)[::-1]:
+                x, y = int(xs[i]), int(ys[i])
+                if any(abs(x - ax) < tw and abs(y - ay) < th for ax, ay in accepted):
+                    continue
+                accepted.append((x, y))
+                elements.append(ScreenElement(
+                    type="template",
+                    bounds=(x * 2, y * 2, tw * 2, th * 2),
+                    text=str(index),
+                    confidence=float(scores[i])
+                ))
+                if len(accepted) >= max_hits:
+                    break
+
+        return elements
+
+    def encode_image_for_openai(self, image) -> str:
+        """Encode image (BGR ndarray or PIL Image) for OpenAI API as base64 JPEG"""
+        quality = self._ss_quality
+        if isinstance(image, np.ndarray):
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
+            return base64.b64encode(encoded).decode("ascii")
+
+        with self._jpeg_lock:
+            buffer = self._jpeg_buf
+            buffer.seek(0)
+            buffer.truncate()
+            image.convert("RGB").save(
+                buffer,
+                format="JPEG",
+                quality=quality,
+                optimize=False,
+                progressive=False
+            )
+            with buffer.getbuffer() as view:
+                return base64.b64encode(view).decode("ascii")
+
+    def image_data_url(self) -> str:
+        """JPEG data URL for the current frame, encoded at most once per capture"""
+        if self.current_frame is None:
             self.take_screenshot()
 
-        image_base64 = self.encode_image_for_openai(self.current_screenshot)
-
-        system_prompt = """You are an AI assistant that can see and control a Linux desktop. You can:
-        1. Click on buttons, icons, menus, and UI elements
-        2. Type text into input fields
-        3. Navigate applications and windows
-        4. Scroll through content
-        5. Press keyboard shortcuts
-
-        When analyzing the screen, provide:
-        - What you can see on the desktop
-        - Identify interactive elements (buttons, text fields, menus, etc.)
-        - Suggest the next logical action based on the task
-        - Provide exact coordinates for any actions
-
-        Respond in JSON format with this structure:
-        {
-            "analysis": "Description of what you see",
-            "elements": [{"type": "button/textfield/icon/etc", "text": "label", "x": 100, "y": 200, "confidence": 0.9}],
-            "suggested_action": {
-                "type": "click/type/key_press/scroll",
-                "x": 100,
-                "y": 200,
-                "text": "text to type (if applicable)",
-                "key": "key to press (if applicable)",
-                "reasoning": "Why this action makes sense"
-            }
-        }"""
+        captured_at, url = self._data_url_cache
+        if url is not None and captured_at == self.last_screenshot_time:
+            return url
+
+        captured_at = self.last_screenshot_time
+        url = "data:image/jpeg;base64," + self.encode_image_for_openai(self.current_frame)
+        self._data_url_cache = (captured_at, url)
+        return url
 
+    def _build_messages(self, task: str, additional_context: str, image_url: str) -> List[Dict[str, Any]]:
+        """Build the chat messages for a Vision analysis request"""
         user_prompt = f"""Current task: {task}
 
         {additional_context}
@@ -267,54 +488,167 @@ class AIDesktopController:
 
         Be precise with coordinates and confident in your suggestions."""
 
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.config["openai"]["model"],
-                messages=[
-                    {"role": "system", "content": system_prompt},
+        return [
+            self._sys_msg,
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": user_prompt},
                     {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": user_prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{image_base64}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url,
+                            "detail": "high"
+                        }
                     }
-                ],
+                ]
+            }
+        ]
+
+    def _parse_ai_response(self, ai_response: str) -> Dict[str, Any]:
+        """Parse the model's reply into an analysis dict"""
+        self.logger.info(f"AI Analysis: {ai_response}")
+
+        # Try to parse JSON response
+        try:
+            return json_loads(ai_response)
+        except ValueError:
+            # Fallback if AI doesn't return proper JSON
+            return {
+                "analysis": ai_response,
+                "elements": [],
+                "suggested_action": {
+                    "type": "wait",
+                    "reasoning": "Could not parse AI response as JSON"
+                }
+            }
+
+    def _early_analysis(self, parts: List[str]) -> Optional[Dict[str, Any]]:
+        """Return the analysis once the streamed reply is complete JSON with an actionable step"""
+        text = "".join(parts)
+        try:
+            analysis = json_loads(text)
+        except ValueError:
+            return None
+
+        suggested = analysis.get("suggested_action") if isinstance(analysis, dict) else None
+        if not suggested or suggested.get("type", "wait") == "wait":
+            return None
+
+        self.logger.info(f"AI Analysis: {text}")
+        return analysis
+
+    @staticmethod
+    def _chunk_text(chunk) -> Optional[str]:
+        """Content delta carried by a streamed completion chunk, if any"""
+        return chunk.choices[0].delta.content if chunk.choices else None
+
+    def _analysis_failed(self, error: Exception) -> Dict[str, Any]:
+        """Analysis result returned when the OpenAI call fails"""
+        self.logger.error(f"AI analysis failed: {error}")
+        return {
+            "analysis": f"Error during AI analysis: {error}",
+            "elements": [],
+            "suggested_action": {"type": "wait", "reasoning": "AI analysis failed"}
+        }
+
+    def analyze_screen_with_ai(self, task: str = "analyze", additional_context: str = "") -> Dict[str, Any]:
+        """Analyze current screen using OpenAI Vision"""
+        image_url = self.image_data_url()
+
+        try:
+            self._wait_for_openai()
+            response = self.openai_client.chat.completions.create(
+                model=self.config["openai"]["model"],
+                messages=self._build_messages(task, additional_context, image_url),
                 max_tokens=self.config["openai"]["max_tokens"],
-                temperature=self.config["openai"]["temperature"]
+                temperature=self.config["openai"]["temperature"],
+                response_format={"type": "json_object"},
+                stream=True
             )
 
-            ai_response = response.choices[0].message.content
-            self.logger.info(f"AI Analysis: {ai_response}")
-
-            # Try to parse JSON response
+            # Dispatch as soon as the reply is complete; stop reading the stream there
+            parts: List[str] = []
             try:
-                analysis = json.loads(ai_response)
-                return analysis
-            except json.JSONDecodeError:
-                # Fallback if AI doesn't return proper JSON
-                return {
-                    "analysis": ai_response,
-                    "elements": [],
-                    "suggested_action": {
-                        "type": "wait",
-                        "reasoning": "Could not parse AI response as JSON"
-                    }
-                }
+                for chunk in response:
+                    delta = self._chunk_text(chunk)
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    if "}" in delta:
+                        analysis = self._early_analysis(parts)
+                        if analysis is not None:
+                            return analysis
+            finally:
+                response.close()
+
+            return self._parse_ai_response("".join(parts))
 
         except Exception as e:
-            self.logger.error(f"AI analysis failed: {e}")
-            return {
-                "analysis": f"Error during AI analysis: {e}",
-                "elements": [],
-                "suggested_action": {"type": "wait", "reasoning": "AI analysis failed"}
-            }
+            return self._analysis_failed(e)
+
+    async def capture_and_encode_async(self) -> str:
+        """Take a screenshot and encode it without blocking the event loop"""
+        await asyncio.to_thread(self.take_screenshot)
+        return await asyncio.to_thread(self.image_data_url)
+
+    async def analyze_screen_with_ai_async(
+        self,
+        client: "openai.AsyncOpenAI",
+        semaphore: asyncio.Semaphore,
+        task: str = "analyze",
+        additional_context: str = "",
+        image_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Analyze a screenshot using the async OpenAI client"""
+        if image_url is None:
+            image_url = await self.capture_and_encode_async()
+
+        try:
+            if self._oai_check is not None:
+                await asyncio.to_thread(self._wait_for_openai)
+            parts: List[str] = []
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=self.config["openai"]["model"],
+                    messages=self._build_messages(task, additional_context, image_url),
+                    max_tokens=self.config["openai"]["max_tokens"],
+                    temperature=self.config["openai"]["temperature"],
+                    response_format={"type": "json_object"},
+                    stream=True
+                )
+
+                # Dispatch as soon as the reply is complete; stop reading the stream there
+                try:
+                    async for chunk in response:
+                        delta = self._chunk_text(chunk)
+                        if not delta:
+                            continue
+                        parts.append(delta)
+                        if "}" in delta:
+                            analysis = self._early_analysis(parts)
+                            if analysis is not None:
+                                return analysis
+                finally:
+                    await response.close()
+
+            return self._parse_ai_response("".join(parts))
+
+        except Exception as e:
+            return self._analysis_failed(e)
+
+    def _async_session(self) -> Tuple["openai.AsyncOpenAI", asyncio.Semaphore]:
+        """Create an async client and request semaphore bound to the running loop"""
+        client = openai.AsyncOpenAI(
+            api_key=self.config["openai"]["api_key"],
+            http_client=httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=OPENAI_POOL_LIMITS,
+                timeout=self.config["openai"].get("timeout", 30.0)
+            )
+        )
+        semaphore = asyncio.Semaphore(self.config["ai"].get("max_concurrent_requests", 2))
+        return client, semaphore
 
     def execute_action(self, action: DesktopAction) -> bool:
         """Execute a desktop action"""
@@ -322,6 +656,11 @@ class AIDesktopController:
             self.logger.warning("Rate limit exceeded, skipping action")
             return False
 
+        # Only sleep for whatever is left of the gap since the previous action
+        wait = self._next_action_deadline - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
         try:
             self.logger.info(f"Executing action: {action.action_type}")
 
@@ -333,7 +672,7 @@ class AIDesktopController:
 
             elif action.action_type == "type":
                 if action.text:
-                    pyautogui.write(action.text, interval=self.config["desktop"]["type_delay"])
+                    pyautogui.write(action.text, interval=self._type_delay)
                     self.logger.info(f"Typed: {action.text}")
 
             elif action.action_type == "key_press":
@@ -366,9 +705,7 @@ class AIDesktopController:
 
             self.interaction_count += 1
             self.action_timestamps.append(time.time())
-
-            # Small delay after each action
-            time.sleep(0.1)
+            self._next_action_deadline = time.monotonic() + self._min_action_gap
 
             return True
 
@@ -378,27 +715,29 @@ class AIDesktopController:
 
     def check_rate_limit(self) -> bool:
         """Check if we're within rate limits"""
-        current_time = time.time()
-        # Remove timestamps older than 1 minute
-        self.action_timestamps = [t for t in self.action_timestamps if current_time - t < 60]
+        cutoff = time.time() - 60
+        # Drop timestamps older than 1 minute from the head of the window
+        timestamps = self.action_timestamps
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
 
         return len(self.action_timestamps) < self.max_actions_per_minute
 
     def get_active_windows(self) -> List[Dict]:
-        """Get list of active windows"""
+        """Get list of active windows (cached briefly; the list rarely changes)"""
+        now = time.monotonic()
+        cached_at, cached = self._win_cache
+        if now - cached_at < self.window_cache_ttl:
+            return cached
+
         try:
-            result = subprocess.run(['wmctrl', '-l'], capture_output=True, text=True)
+            result = subprocess.run(['wmctrl', '-l'], capture_output=True, text=True, check=False)
             windows = []
-            for line in result.stdout.split('\n'):
-                if line.strip():
-                    parts = line.split(None, 3)
-                    if len(parts) >= 4:
-                        windows.append({
-                            'id': parts[0],
-                            'desktop': parts[1],
-                            'host': parts[2],
-                            'title': parts[3]
-                        })
+            for line in result.stdout.splitlines():
+                parts = line.split(None, 3)
+                if len(parts) == 4:
+                    windows.append(dict(zip(('id', 'desktop', 'host', 'title'), parts)))
+            self._win_cache = (now, windows)
             return windows
         except Exception as e:
             self.logger.error(f"Failed to get active windows: {e}")
@@ -406,53 +745,61 @@ class AIDesktopController:
 
     def execute_ai_task(self, task: str, max_iterations: int = 10) -> bool:
         """Execute a high-level task using AI"""
+        return asyncio.run(self.execute_ai_task_async(task, max_iterations))
+
+    async def execute_ai_task_async(self, task: str, max_iterations: int = 10) -> bool:
+        """Execute a high-level task using AI on an asyncio event loop"""
         self.logger.info(f"🤖 Starting AI task: {task}")
 
         iteration = 0
         task_completed = False
+        client, semaphore = self._async_session()
 
-        while iteration < max_iterations and not task_completed:
-            iteration += 1
-            self.logger.info(f"Task iteration {iteration}/{max_iterations}")
-
-            # Take screenshot and analyze
-            self.take_screenshot()
-            analysis = self.analyze_screen_with_ai(task)
+        async with client:
+            while iteration < max_iterations and not task_completed:
+                iteration += 1
+                self.logger.info(f"Task iteration {iteration}/{max_iterations}")
 
-            # Log the analysis
-            self.logger.info(f"AI sees: {analysis.get('analysis', 'No analysis')}")
+                # Take screenshot and analyze; capture and encode run off the loop
+                image_url = await self.capture_and_encode_async()
+                analysis = await self.analyze_screen_with_ai_async(
+                    client, semaphore, task, image_url=image_url
+                )
 
-            # Get suggested action
-            suggested = analysis.get('suggested_action', {})
-            if not suggested or suggested.get('type') == 'wait':
-                self.logger.info("AI suggests waiting or no action needed")
-                time.sleep(2)
-                continue
+                # Log the analysis
+                self.logger.info(f"AI sees: {analysis.get('analysis', 'No analysis')}")
 
-            # Create and execute action
-            action = DesktopAction(
-                action_type=suggested.get('type', 'wait'),
-                x=suggested.get('x'),
-                y=suggested.get('y'),
-                text=suggested.get('text'),
-                key=suggested.get('key'),
-                reasoning=suggested.get('reasoning', '')
-            )
+                # Get suggested action
+                suggested = analysis.get('suggested_action', {})
+                if not suggested or suggested.get('type') == 'wait':
+                    self.logger.info("AI suggests waiting or no action needed")
+                    await asyncio.sleep(2)
+                    continue
+
+                # Create and execute action
+                action = DesktopAction(
+                    action_type=suggested.get('type', 'wait'),
+                    x=suggested.get('x'),
+                    y=suggested.get('y'),
+                    text=suggested.get('text'),
+                    key=suggested.get('key'),
+                    reasoning=suggested.get('reasoning', '')
+                )
 
-            self.logger.info(f"AI reasoning: {action.reasoning}")
+                self.logger.info(f"AI reasoning: {action.reasoning}")
 
-            if action.action_type == 'task_complete':
-                self.logger.info("🎉 AI reports task completed!")
-                task_completed = True
-                break
+                if action.action_type == 'task_complete':
+                    self.logger.info("🎉 AI reports task completed!")
+                    task_completed = True
+                    break
 
-            # Execute the action
-            success = self.execute_action(action)
-            if not success:
-                self.logger.warning("Action execution failed")
+                # Execute the action
+                success = await asyncio.to_thread(self.execute_action, action)
+                if not success:
+                    self.logger.warning("Action execution failed")
 
-            # Wait before next iteration
-            time.sleep(self.config["ai"]["decision_interval"])
+                # Wait before next iteration
+                await asyncio.sleep(self.config["ai"]["decision_interval"])
 
         if task_completed:
             self.logger.info(f"✅ Task '{task}' completed successfully")
@@ -467,12 +814,42 @@ class AIDesktopController:
         self.is_running = True
 
         try:
+            asyncio.run(self.start_autonomous_mode_async())
+        except KeyboardInterrupt:
+            self.logger.info("Autonomous mode stopped by user")
+        except Exception as e:
+            self.logger.error(f"Error in autonomous mode: {e}")
+        finally:
+            self.is_running = False
+
+    async def start_autonomous_mode_async(self):
+        """Autonomous exploration loop running on an asyncio event loop"""
+        client, semaphore = self._async_session()
+        base_interval = self.config["ai"]["decision_interval"]
+        interval = base_interval
+        # Fingerprint of the last frame this loop analyzed; other callers' captures don't count
+        analyzed_hash = None
+
+        async with client:
             while self.is_running:
-                # Take screenshot and analyze current state
-                self.take_screenshot()
-                analysis = self.analyze_screen_with_ai(
+                # Take screenshot; skip the encode and AI call while the desktop is static
+                _, frame_hash = await asyncio.to_thread(self.take_screenshot_with_hash)
+                if frame_hash == analyzed_hash and self.config["ai"].get("skip_unchanged_frames", True):
+                    interval = min(interval * 2, base_interval * self.idle_backoff_max)
+                    self.logger.debug("Screen unchanged, next check in %.1fs", interval)
+                    await asyncio.sleep(interval)
+                    continue
+                interval = base_interval
+                analyzed_hash = frame_hash
+
+                # Analyze current state
+                image_url = await asyncio.to_thread(self.image_data_url)
+                analysis = await self.analyze_screen_with_ai_async(
+                    client,
+                    semaphore,
                     task="explore and interact with the desktop",
-                    additional_context="You are in autonomous exploration mode. Look for interesting applications to open, websites to browse, or tasks to perform."
+                    additional_context="You are in autonomous exploration mode. Look for interesting applications to open, websites to browse, or tasks to perform.",
+                    image_url=image_url
                 )
 
                 # Get and execute suggested action
@@ -487,17 +864,10 @@ class AIDesktopController:
                         reasoning=suggested.get('reasoning', '')
                     )
 
-                    self.execute_action(action)
+                    await asyncio.to_thread(self.execute_action, action)
 
                 # Wait before next decision
-                time.sleep(self.config["ai"]["decision_interval"])
-
-        except KeyboardInterrupt:
-            self.logger.info("Autonomous mode stopped by user")
-        except Exception as e:
-            self.logger.error(f"Error in autonomous mode: {e}")
-        finally:
-            self.is_running = False
+                await asyncio.sleep(interval)
 
     def stop(self):
         """Stop the AI controller"""
@@ -507,8 +877,9 @@ class AIDesktopController:
     def get_system_info(self) -> Dict:
         """Get system information"""
         return {
-            "screen_size": self.screen_size,
-            "mouse_position": pyautogui.position(),
+            # Plain lists: pyautogui's Size/Point namedtuples aren't JSON-native for orjson
+            "screen_size": list(self.screen_size),
+            "mouse_position": list(pyautogui.position()),
             "cpu_percent": psutil.cpu_percent(),
             "memory_percent": psutil.virtual_memory().percent,
             "active_windows": self.get_active_windows(),
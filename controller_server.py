@@ -1,7 +1,12 @@
+import time
+
+import anyio
 from fastapi import FastAPI, Response
 from pydantic import BaseModel
 import uvicorn
-from desktop_control import move_mouse, click, type_text, key_press, window_list, window_activate, screenshot_png
+from desktop_control import (
+    move_mouse, click, type_text, key_press, window_list, window_activate, screenshot_png, screenshot_jpeg
+)
 
 
 class Move(BaseModel):
@@ -27,34 +32,55 @@ class Activate(BaseModel):
 
 app = FastAPI(title="Linux Desktop Controller")
 
+WINDOWS_CACHE_TTL = 0.5  # seconds
+_windows_cache = (float("-inf"), "")
+
+# Captures share one X display handle, so run them one at a time off the event loop
+_capture_sem = anyio.Semaphore(1)
+
+
+# All input goes through one worker at a time, in arrival order; a long /type
+# would otherwise hold the libxdo lock on the event loop thread
+_input_limiter = anyio.CapacityLimiter(1)
+
+
+async def _input(func, *args) -> None:
+    await anyio.to_thread.run_sync(func, *args, limiter=_input_limiter)
+
 
 @app.post("/move")
-def api_move(body: Move):
-    move_mouse(body.x, body.y)
+async def api_move(body: Move):
+    await _input(move_mouse, body.x, body.y)
     return {"status": "ok"}
 
 
 @app.post("/click")
-def api_click(body: Click):
-    click(body.button)
+async def api_click(body: Click):
+    await _input(click, body.button)
     return {"status": "ok"}
 
 
 @app.post("/type")
-def api_type(body: TypeText):
-    type_text(body.text)
+async def api_type(body: TypeText):
+    await _input(type_text, body.text)
     return {"status": "ok"}
 
 
 @app.post("/key")
-def api_key(body: Key):
-    key_press(body.key)
+async def api_key(body: Key):
+    await _input(key_press, body.key)
     return {"status": "ok"}
 
 
 @app.get("/windows")
 def api_windows():
-    return {"windows": window_list()}
+    global _windows_cache
+    now = time.monotonic()
+    cached_at, windows = _windows_cache
+    if now - cached_at >= WINDOWS_CACHE_TTL:
+        windows = window_list()
+        _windows_cache = (now, windows)
+    return {"windows": windows}
 
 
 @app.post("/activate")
@@ -64,11 +90,19 @@ def api_activate(body: Activate):
 
 
 @app.get("/screenshot")
-def api_screenshot():
-    img = screenshot_png()
+async def api_screenshot():
+    async with _capture_sem:
+        img = await anyio.to_thread.run_sync(screenshot_png)
     return Response(content=img, media_type="image/png")
 
 
+@app.get("/screenshot.jpg")
+async def api_screenshot_jpeg():
+    async with _capture_sem:
+        img = await anyio.to_thread.run_sync(screenshot_jpeg)
+    return Response(content=img, media_type="image/jpeg")
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8765)
 
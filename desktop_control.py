@@ -1,44 +1,130 @@
 import subprocess
 import tempfile
+import threading
+from io import BytesIO
 from pathlib import Path
+from typing import List
 
+# Persistent libxdo session; falls back to spawning xdotool if unavailable
+try:
+    from xdo import Xdo
+    _xdo = Xdo()
+except Exception:
+    _xdo = None
 
-def run_command(command: str) -> str:
-    result = subprocess.run(command, shell=True, capture_output=True, text=True)
+HAS_XDO = _xdo is not None
+# One X connection behind _xdo: calls from different threads must not overlap
+_xdo_lock = threading.Lock()
+
+# In-process screen capture; falls back to scrot if unavailable.
+# mss keeps its X display per thread, so each capturing thread gets its own instance.
+_sct_local = threading.local()
+try:
+    import mss
+    from PIL import Image
+    _sct_local.sct = mss.mss()
+    HAS_MSS = True
+except Exception:
+    HAS_MSS = False
+
+CURRENT_WINDOW = 0
+
+_capture_lock = threading.Lock()
+_encode_buf = BytesIO()
+
+
+def _grabber():
+    sct = getattr(_sct_local, "sct", None)
+    if sct is None:
+        sct = _sct_local.sct = mss.mss()
+    return sct
+
+
+def run_command(args: List[str]) -> str:
+    result = subprocess.run(args, capture_output=True, text=True)
     if result.returncode != 0:
-        raise RuntimeError(f"Command failed: {command}\n{result.stderr}")
+        raise RuntimeError(f"Command failed: {' '.join(args)}\n{result.stderr}")
     return result.stdout.strip()
 
 
+def _xdo_cleared(send) -> None:
+    # Same as xdotool --clearmodifiers: release held modifiers, send, then restore them
+    mods = _xdo.get_active_modifiers()
+    _xdo.clear_active_modifiers(CURRENT_WINDOW, mods)
+    try:
+        send()
+    finally:
+        _xdo.set_active_modifiers(CURRENT_WINDOW, mods)
+
+
 def move_mouse(x: int, y: int) -> None:
-    run_command(f"xdotool mousemove {x} {y}")
+    if _xdo is not None:
+        with _xdo_lock:
+            _xdo.move_mouse(x, y)
+        return
+    run_command(["xdotool", "mousemove", str(x), str(y)])
 
 
 def click(button: int = 1) -> None:
-    run_command(f"xdotool click {button}")
+    if _xdo is not None:
+        with _xdo_lock:
+            _xdo.click_window(CURRENT_WINDOW, button)
+        return
+    run_command(["xdotool", "click", str(button)])
 
 
 def type_text(text: str) -> None:
     escaped = text.replace("\n", " ")
-    run_command(f"xdotool type --delay 1 --clearmodifiers -- '{escaped}'")
+    if _xdo is not None:
+        with _xdo_lock:
+            _xdo_cleared(lambda: _xdo.enter_text_window(CURRENT_WINDOW, escaped.encode("utf-8"), delay=1000))
+        return
+    run_command(["xdotool", "type", "--delay", "1", "--clearmodifiers", "--", escaped])
 
 
 def key_press(key: str) -> None:
-    run_command(f"xdotool key --clearmodifiers {key}")
+    if _xdo is not None:
+        with _xdo_lock:
+            _xdo_cleared(lambda: _xdo.send_keysequence_window(CURRENT_WINDOW, key.encode("utf-8"), delay=0))
+        return
+    run_command(["xdotool", "key", "--clearmodifiers", key])
 
 
 def window_list() -> str:
-    return run_command("wmctrl -lx")
+    return run_command(["wmctrl", "-lx"])
 
 
 def window_activate(window_id: str) -> None:
-    run_command(f"wmctrl -ia {window_id}")
+    run_command(["wmctrl", "-ia", window_id])
 
 
-def screenshot_png() -> bytes:
+def _scrot_capture(filename: str = "screen.png", quality: int = 75) -> bytes:
     with tempfile.TemporaryDirectory() as td:
-        path = Path(td) / "screen.png"
-        run_command(f"scrot -o -q 75 {path}")
+        path = Path(td) / filename
+        run_command(["scrot", "-o", "-q", str(quality), str(path)])
         return path.read_bytes()
 
 
+def _encode_screen(fmt: str, **params) -> bytes:
+    # Shared encode buffer is used by one caller at a time
+    with _capture_lock:
+        sct = _grabber()
+        raw = sct.grab(sct.monitors[1])
+        img = Image.frombuffer("RGB", raw.size, raw.rgb, "raw", "RGB", 0, 1)
+        buf = _encode_buf
+        buf.seek(0)
+        buf.truncate()
+        img.save(buf, fmt, **params)
+        return buf.getvalue()
+
+
+def screenshot_png() -> bytes:
+    if not HAS_MSS:
+        return _scrot_capture()
+    return _encode_screen("PNG")
+
+
+def screenshot_jpeg(quality: int = 75) -> bytes:
+    if not HAS_MSS:
+        return _scrot_capture("screen.jpg", quality)
+    return _encode_screen("JPEG", quality=quality)
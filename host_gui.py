@@ -1,169 +1,574 @@
+import asyncio
+import ctypes
+import ctypes.util
 import os
+import re
 import subprocess
+import tempfile
 import threading
+import time
+from dataclasses import dataclass
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import RedirectResponse, PlainTextResponse, JSONResponse
+from fastapi.responses import (
+    HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+import jinja2
 import uvicorn
 
+try:
+    import orjson
+
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+
+    class FastJSONResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return orjson.dumps(content)
+except ImportError:
+    import json
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    json_loads = json.loads
+    FastJSONResponse = JSONResponse
+
 
 APP_ROOT = Path(__file__).parent
 ENV_FILE = APP_ROOT / ".env"
 COMPOSE_WORKDIR = Path(os.environ.get("COMPOSE_WORKDIR", str(APP_ROOT)))
 LOG_DIR = APP_ROOT / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
+JOB_STATE_FILE = LOG_DIR / "job_state.json"
+# A restored job older than this is treated as finished, in case its pid was reused
+RESTORED_JOB_MAX_AGE = float(os.environ.get("RESTORED_JOB_MAX_AGE", 6 * 3600))
+NOVNC_PREFIX = f"http://localhost:{os.environ.get('NOVNC_PORT', '8080')}/vnc.html?autoconnect=1"
 
-# Simple background job state
+# Simple background job state; writers hold _job_lock and publish a new
+# JobSnapshot, readers just load _job_snap
 _job_lock = threading.Lock()
-_job_name: Optional[str] = None
-_job_proc: Optional[subprocess.Popen] = None
-_job_log: Optional[Path] = None
 
+# Jobs run on one event loop thread, started on first use
+_job_loop: Optional[asyncio.AbstractEventLoop] = None
 
-def read_env_file() -> Dict[str, str]:
-    values: Dict[str, str] = {}
-    if ENV_FILE.exists():
-        for line in ENV_FILE.read_text(encoding="utf-8").splitlines():
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "=" in line:
-                key, val = line.split("=", 1)
-                values[key.strip()] = val.strip()
-    return values
+# Live output of a job is kept in a ring and served from memory;
+# the on-disk log is appended to once LOG_FLUSH_BYTES have piled up or
+# LOG_FLUSH_SECONDS have passed, into space reserved up front
+LOG_RING_BYTES = 128 * 1024
+LOG_FLUSH_BYTES = 64 * 1024
+LOG_FLUSH_SECONDS = 0.1
+LOG_PREALLOC_BYTES = 4 << 20
+# Log bytes are UTF-8 as docker wrote them; plain-text responses hand them over undecoded
+LOG_MEDIA_TYPE = "text/plain; charset=utf-8"
 
+# fallocate(2) with FALLOC_FL_KEEP_SIZE reserves blocks without moving EOF, so
+# O_APPEND writes and tail readers are unaffected; os.posix_fallocate can't do that
+FALLOC_FL_KEEP_SIZE = 0x01
+try:
+    _fallocate = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True).fallocate
+    _fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong)
+except (OSError, AttributeError, TypeError):
+    _fallocate = None
 
-def write_env_file(values: Dict[str, str]) -> None:
-    lines = [f"{k}={v}" for k, v in values.items()]
-    ENV_FILE.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
+def _preallocate(fd: int, size: int) -> bool:
+    return _fallocate is not None and _fallocate(fd, FALLOC_FL_KEEP_SIZE, 0, size) == 0
 
-def run_compose(args: str) -> subprocess.CompletedProcess:
-    return subprocess.run(
-        f"docker compose {args}",
+# The UI polls /status continuously; reuse `docker ps` output for a short while
+_DS_TTL = 1.0
+_ds_lock: Optional[asyncio.Lock] = None
+_ds_cache: Tuple[float, str] = (float("-inf"), "")
+
+# Parsed .env keyed on its mtime so page loads don't re-parse an unchanged file
+_env_cache: Tuple[Optional[int], Dict[str, str]] = (None, {})
+# KEY=VALUE lines; comments and blank lines never match
+_ENV_RE = re.compile(rb"(?m)^[ \t]*([^#=\s][^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t\r]*$")
+
+
+def read_env_file() -> Dict[str, str]:
+    global _env_cache
+    try:
+        mtime = ENV_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached_mtime, cached = _env_cache
+    if cached_mtime == mtime:
+        return dict(cached)
+    values = {
+        m.group(1).decode("utf-8"): m.group(2).decode("utf-8")
+        for m in _ENV_RE.finditer(ENV_FILE.read_bytes())
+    }
+    _env_cache = (mtime, values)
+    return dict(values)
+
+
+def write_file_atomic(path: Path, data: bytes, fsync: bool = True) -> None:
+    # Write a temp file and rename it over the target so readers never see a partial file
+    # A unique temp name per call, so concurrent writers never share one
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_env_file(values: Dict[str, str]) -> None:
+    global _env_cache
+    buf = bytearray()
+    for k, v in values.items():
+        buf += k.encode("utf-8")
+        buf += b"="
+        buf += v.encode("utf-8")
+        buf += b"\n"
+    write_file_atomic(ENV_FILE, bytes(buf), fsync=os.environ.get("ENV_FSYNC") != "0")
+    _env_cache = (None, {})
+
+
+async def run_compose(args: List[str]) -> subprocess.CompletedProcess:
+    proc = await asyncio.create_subprocess_exec(
+        "docker", "compose", *args,
         cwd=str(COMPOSE_WORKDIR),
-        shell=True,
-        text=True,
-        capture_output=True,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await proc.communicate()
+    return subprocess.CompletedProcess(
+        args, proc.returncode, out.decode("utf-8", errors="replace"), err.decode("utf-8", errors="replace")
     )
 
 
-def start_compose_job(name: str, args: str) -> bool:
-    global _job_name, _job_proc, _job_log
+def _get_job_loop() -> asyncio.AbstractEventLoop:
+    global _job_loop
     with _job_lock:
-        if _job_proc and _job_proc.poll() is None:
+        if _job_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="compose-jobs", daemon=True).start()
+            _job_loop = loop
+        return _job_loop
+
+
+class JobState:
+    """Output and exit status of one compose job; mutated under _job_lock."""
+
+    def __init__(self, name: str, log_path: Path, fd: Optional[int]):
+        # fd is None for a job restored from JOB_STATE_FILE; its output isn't ours
+        self.name = name
+        self.log_path = log_path
+        self.fd = fd
+        self.file_id = os.fstat(fd).st_ino if fd is not None else None
+        self.started_at = time.time()
+        self.ring = bytearray(LOG_RING_BYTES)
+        self.head = 0
+        self.total = 0
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+        self.flush_timer: Optional[asyncio.TimerHandle] = None
+        self.preallocated = False
+        self.pid: Optional[int] = None
+        self.exit_code: Optional[int] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def attached(self) -> bool:
+        return self.fd is not None
+
+    @property
+    def running(self) -> bool:
+        if self.exit_code is not None:
+            return False
+        if not self.attached:
+            return (
+                self.pid is not None
+                and time.time() - self.started_at < RESTORED_JOB_MAX_AGE
+                and _pid_alive(self.pid)
+            )
+        return True
+
+    def persist(self) -> None:
+        state = {
+            "pid": self.pid,
+            "name": self.name,
+            "log": str(self.log_path),
+            "started_at": self.started_at,
+            "exit_code": self.exit_code,
+        }
+        try:
+            write_file_atomic(JOB_STATE_FILE, json_dumps(state), fsync=False)
+        except OSError:
+            pass
+
+    def on_chunk(self, chunk: bytes) -> None:
+        with _job_lock:
+            self._write_ring(chunk)
+        self.pending.append(chunk)
+        self.pending_size += len(chunk)
+        if self.pending_size >= LOG_FLUSH_BYTES:
+            self.flush()
+        elif self.flush_timer is None:
+            self.flush_timer = asyncio.get_running_loop().call_later(LOG_FLUSH_SECONDS, self.flush)
+
+    def flush(self) -> None:
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        if self.pending:
+            # One joined buffer: writev caps at IOV_MAX chunks and may write only part of them
+            data = memoryview(b"".join(self.pending))
+            self.pending.clear()
+            self.pending_size = 0
+            while data:
+                data = data[os.write(self.fd, data):]
+
+    def _write_ring(self, chunk: bytes) -> None:
+        size = LOG_RING_BYTES
+        self.total += len(chunk)
+        if len(chunk) >= size:
+            self.ring[:] = chunk[-size:]
+            self.head = 0
+            return
+        head = self.head
+        first = min(len(chunk), size - head)
+        self.ring[head:head + first] = chunk[:first]
+        if first < len(chunk):
+            self.ring[:len(chunk) - first] = chunk[first:]
+        self.head = (head + len(chunk)) % size
+
+    def read_chunk(
+        self,
+        since: Optional[int] = None,
+        file_id: Optional[int] = None,
+        max_bytes: int = 64_000,
+    ) -> Dict[str, object]:
+        """Like read_log_chunk, but served from the in-memory ring."""
+        data, start, reset = self._read_ring(since, file_id, max_bytes)
+        return _log_chunk(data, start, self.file_id, reset)
+
+    def read_tail(self, max_bytes: int = 64_000) -> bytes:
+        return self._read_ring(None, None, max_bytes)[0]
+
+    def _read_ring(self, since: Optional[int], file_id: Optional[int], max_bytes: int) -> Tuple[bytes, int, bool]:
+        size = LOG_RING_BYTES
+        with _job_lock:
+            total, head = self.total, self.head
+            oldest = total - min(total, size)
+            reset = (
+                since is None
+                or file_id != self.file_id
+                or since > total
+                or since < oldest
+                or total - since > max_bytes
+            )
+            start = max(oldest, total - max_bytes) if reset else since
+            n = total - start
+            if n <= head:
+                data = bytes(self.ring[head - n:head])
+            else:
+                data = bytes(self.ring[size - (n - head):]) + bytes(self.ring[:head])
+        return data, start, reset
+
+
+class _JobProtocol(asyncio.SubprocessProtocol):
+    # The loop's selector hands pipe reads straight to the job, no per-job reader
+    def __init__(self, job: JobState, done: "asyncio.Future[None]"):
+        self.job = job
+        self.done = done
+
+    def pipe_data_received(self, fd: int, data: bytes) -> None:
+        self.job.on_chunk(data)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if not self.done.done():
+            self.done.set_result(None)
+
+
+async def _run_job(job: JobState, commands: Tuple[List[str], ...]) -> None:
+    loop = asyncio.get_running_loop()
+    returncode = 0
+    trailer = ""
+    try:
+        for args in commands:
+            done = loop.create_future()
+            transport, _ = await loop.subprocess_exec(
+                lambda: _JobProtocol(job, done),
+                "docker", "compose", *args,
+                cwd=str(COMPOSE_WORKDIR),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                # Own session so Ctrl+C on the GUI doesn't interrupt a build
+                start_new_session=True,
+                close_fds=True,
+            )
+            with _job_lock:
+                job.pid = transport.get_pid()
+            job.persist()
+            try:
+                await done
+                returncode = transport.get_returncode()
+            finally:
+                transport.close()
+            if returncode != 0:
+                break
+    except OSError as e:
+        trailer = f"{e}\n"
+        returncode = 127
+    finally:
+        try:
+            try:
+                job.on_chunk(f"{trailer}\n[exit_code]={returncode}\n".encode("utf-8"))
+                job.flush()
+                if job.preallocated:
+                    # Give back the reserved blocks past the end of the log
+                    os.ftruncate(job.fd, os.fstat(job.fd).st_size)
+            finally:
+                os.close(job.fd)
+        finally:
+            # Publish the exit even if the log couldn't be written, or the job looks stuck
+            with _job_lock:
+                job.exit_code = returncode
+                _publish_job(job)
+            job.persist()
+
+
+@dataclass(frozen=True)
+class JobSnapshot:
+    job: Optional[JobState]
+    generation: int
+    status: Dict[str, Optional[str]]
+
+
+def _job_status(job: Optional[JobState]) -> Dict[str, Optional[str]]:
+    running = job is not None and job.running
+    exit_code = None if running or job is None or job.exit_code is None else str(job.exit_code)
+    return {
+        "running": running,
+        "name": job.name if job else None,
+        "exit_code": exit_code,
+        "log": str(job.log_path) if job else None,
+    }
+
+
+_job_snap = JobSnapshot(None, 0, _job_status(None))
+
+
+def _publish_job(job: Optional[JobState]) -> None:
+    # Caller holds _job_lock; rebinding the global is atomic for readers
+    global _job_snap
+    _job_snap = JobSnapshot(job, _job_snap.generation + 1, _job_status(job))
+
+
+def _pid_alive(pid: int) -> bool:
+    # On Windows os.kill(pid, 0) terminates the process instead of probing it
+    if os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # After a container restart the pid may belong to an unrelated process
+    try:
+        return b"compose" in Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return True
+
+
+def _restore_job() -> Optional[JobState]:
+    # Pick up the last job recorded by a previous GUI process
+    try:
+        state = json_loads(JOB_STATE_FILE.read_bytes())
+        job = JobState(state["name"], Path(state["log"]), None)
+        job.pid = state.get("pid")
+        job.started_at = state.get("started_at", job.started_at)
+        job.exit_code = state.get("exit_code")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return job
+
+
+async def start_compose_job(name: str, *commands: List[str]) -> bool:
+    """Run one or more `docker compose` commands in sequence as a background job.
+
+    Must run on the job loop; later commands only run if the previous one
+    exited successfully.
+    """
+    with _job_lock:
+        current = _job_snap.job
+        if current is not None and current.running:
             return False  # job already running
         log_path = LOG_DIR / f"{name}.log"
         try:
             log_path.unlink(missing_ok=True)
         except Exception:
             pass
-        log_file = open(log_path, "a", encoding="utf-8", buffering=1)
-        proc = subprocess.Popen(
-            f"docker compose {args}",
-            cwd=str(COMPOSE_WORKDIR),
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-        )
-
-        def _pump():
-            assert proc.stdout is not None
-            for line in proc.stdout:
-                try:
-                    log_file.write(line)
-                except Exception:
-                    pass
-            proc.wait()
-            try:
-                log_file.write(f"\n[exit_code]={proc.returncode}\n")
-                log_file.close()
-            except Exception:
-                pass
-
-        threading.Thread(target=_pump, daemon=True).start()
-        _job_name = name
-        _job_proc = proc
-        _job_log = log_path
+        fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o644)
+        job = JobState(name, log_path, fd)
+        job.preallocated = _preallocate(fd, LOG_PREALLOC_BYTES)
+        job.task = asyncio.get_running_loop().create_task(_run_job(job, commands))
+        _publish_job(job)
         return True
 
 
-def get_job_status() -> Dict[str, Optional[str]]:
-    with _job_lock:
-        running = _job_proc is not None and _job_proc.poll() is None
-        exit_code = None if running or _job_proc is None else str(_job_proc.returncode)
-        return {
-            "running": running,
-            "name": _job_name,
-            "exit_code": exit_code,
-            "log": str(_job_log) if _job_log else None,
-        }
+with _job_lock:
+    _publish_job(_restore_job())
 
 
-def read_log_tail(path: Path, max_bytes: int = 64_000) -> str:
-    if not path.exists():
-        return ""
-    data = path.read_bytes()
-    if len(data) > max_bytes:
-        data = data[-max_bytes:]
-    try:
-        return data.decode("utf-8", errors="replace")
-    except Exception:
-        return ""
+async def submit_compose_job(name: str, *commands: List[str]) -> bool:
+    future = asyncio.run_coroutine_threadsafe(start_compose_job(name, *commands), _get_job_loop())
+    return await asyncio.wrap_future(future)
 
 
-def get_container_status() -> str:
+def get_job_status() -> Dict[str, Optional[str]]:
+    # The returned dict is shared between callers until the job state changes
+    snap = _job_snap
+    # A restored job's liveness can change without a new snapshot
+    if snap.job is not None and not snap.job.attached:
+        return _job_status(snap.job)
+    return snap.status
+
+
+def read_log_chunk(
+    path: Path,
+    since: Optional[int] = None,
+    file_id: Optional[int] = None,
+    max_bytes: int = 64_000,
+) -> Dict[str, object]:
+    """Read log bytes after `since`, or the last `max_bytes` when the cursor is stale.
+
+    `file_id` is the inode the cursor was taken from, so a job that recreated the
+    log is detected. Only the requested window is read from disk.
+    """
+    # Plain seek + read rather than os.pread, which Windows lacks
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return {"offset": 0, "file": None, "reset": True, "data": ""}
+    with f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        reset = (
+            since is None
+            or file_id != st.st_ino
+            or since < 0
+            or since > size
+            or size - since > max_bytes
+        )
+        start = max(0, size - max_bytes) if reset else since
+        f.seek(start)
+        data = f.read(size - start)
+    return _log_chunk(data, start, st.st_ino, reset)
+
+
+def _log_chunk(data: bytes, start: int, file_id: Optional[int], reset: bool) -> Dict[str, object]:
+    if not reset:
+        # Hold back a trailing partial line so multi-byte characters aren't split
+        cut = data.rfind(b"\n") + 1
+        if cut:
+            data = data[:cut]
+    return {
+        "offset": start + len(data),
+        "file": file_id,
+        "reset": reset,
+        "data": data.decode("utf-8", errors="replace"),
+    }
+
+
+async def stream_log_tail(path: Path, max_bytes: int = 64_000, chunk_size: int = 16_384) -> AsyncIterator[bytes]:
+    """Yield the last `max_bytes` of a log as raw chunks, without decoding them."""
+    try:
+        f = open(path, "rb", buffering=0)
+    except OSError:
+        return
+    with f:
+        end = os.fstat(f.fileno()).st_size
+        start = max(0, end - max_bytes)
+        f.seek(start)
+        while start < end:
+            chunk = f.read(min(chunk_size, end - start))
+            if not chunk:
+                break
+            start += len(chunk)
+            yield chunk
+
+
+async def get_container_status() -> str:
     # Returns running status string or empty if not running
-    proc = subprocess.run(
-        "docker ps --filter name=linux-desktop --format \"{{.Status}}\"",
-        shell=True,
-        text=True,
-        capture_output=True,
-    )
-    if proc.returncode != 0:
-        return ""
-    return (proc.stdout or "").strip()
+    global _ds_cache, _ds_lock
+    if _ds_lock is None:
+        _ds_lock = asyncio.Lock()
+    async with _ds_lock:
+        now = time.monotonic()
+        ts, val = _ds_cache
+        if now - ts < _DS_TTL:
+            return val
+        proc = await asyncio.create_subprocess_exec(
+            "docker", "ps", "--filter", "name=linux-desktop", "--format", "{{.Status}}",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await proc.communicate()
+        val = out.decode("utf-8", errors="replace").strip() if proc.returncode == 0 else ""
+        _ds_cache = (now, val)
+        return val
 
 
 app = FastAPI(title="AI Desktop Controller - Host GUI")
 
-templates = Jinja2Templates(directory=str(APP_ROOT / "templates"))
+# Templates ship with the app, so skip per-render mtime checks and keep
+# compiled bytecode in the per-user temp cache directory
+_jinja_env = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(str(APP_ROOT / "templates")),
+    autoescape=jinja2.select_autoescape(["html"]),
+    auto_reload=False,
+    bytecode_cache=jinja2.FileSystemBytecodeCache(),
+)
+templates = Jinja2Templates(env=_jinja_env)
+_INDEX_TMPL = templates.get_template("index.html")
 (APP_ROOT / "static").mkdir(parents=True, exist_ok=True)
 app.mount("/static", StaticFiles(directory=str(APP_ROOT / "static")), name="static")
 
 
 @app.get("/")
-def index(request: Request):
+async def index(request: Request):
     env = read_env_file()
-    status = get_container_status()
-    vnc_port = os.environ.get("NOVNC_PORT", "8080")
+    status = await get_container_status()
     vnc_password = env.get("VNC_PASSWORD", "")
     resolution = env.get("RESOLUTION", "1920x1080")
     depth = env.get("DEPTH", "24")
-    novnc_url = f"http://localhost:{vnc_port}/vnc.html?autoconnect=1"
+    novnc_url = NOVNC_PREFIX
     if vnc_password:
         novnc_url += f"&password={vnc_password}"
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request,
-            "status": status or "not running",
-            "resolution": resolution,
-            "depth": depth,
-            "vnc_password": vnc_password,
-            "novnc_url": novnc_url,
-        },
-    )
+    return HTMLResponse(_INDEX_TMPL.render(
+        request=request,
+        status=status or "not running",
+        resolution=resolution,
+        depth=depth,
+        vnc_password=vnc_password,
+        novnc_url=novnc_url,
+    ))
 
 
 @app.post("/save")
-def save(
+async def save(
     request: Request,
     vnc_password: str = Form(""),
     resolution: str = Form("1920x1080"),
@@ -173,47 +578,63 @@ def save(
     env["VNC_PASSWORD"] = vnc_password or env.get("VNC_PASSWORD", "changeme")
     env["RESOLUTION"] = resolution
     env["DEPTH"] = depth
-    write_env_file(env)
+    await asyncio.to_thread(write_env_file, env)
     return RedirectResponse("/", status_code=303)
 
 
 @app.post("/action")
-def action(request: Request, action: str = Form(...)):
+async def action(request: Request, action: str = Form(...)):
     if action == "build":
-        start_compose_job("build", "build")
+        await submit_compose_job("build", ["build"])
     elif action == "up":
-        start_compose_job("up", "up -d")
+        await submit_compose_job("up", ["up", "-d"])
     elif action == "down":
-        start_compose_job("down", "down")
+        await submit_compose_job("down", ["down"])
     elif action == "restart":
-        start_compose_job("restart", "down && docker compose up -d")
+        await submit_compose_job("restart", ["down"], ["up", "-d"])
     return RedirectResponse("/", status_code=303)
 
 
 @app.get("/status")
-def status_api():
+async def status_api():
     job = get_job_status()
-    return JSONResponse({
+    return FastJSONResponse({
         "job": job,
-        "desktop": get_container_status(),
+        "desktop": await get_container_status(),
     })
 
 
 @app.get("/logs", response_class=PlainTextResponse)
-def logs_api(name: Optional[str] = None):
-    with _job_lock:
-        log_path = None
-        if name:
-            candidate = LOG_DIR / f"{name}.log"
-            log_path = candidate if candidate.exists() else _job_log
-        else:
-            log_path = _job_log
+async def logs_api(name: Optional[str] = None, since: Optional[int] = None, file: Optional[int] = None):
+    job = _job_snap.job
+    current_log = job.log_path if job else None
+    log_path = current_log
+    if name:
+        candidate = LOG_DIR / f"{name}.log"
+        if candidate.exists():
+            log_path = candidate
+    live = job is not None and job.attached and log_path == current_log
+    if since is None:
+        if live:
+            return Response(job.read_tail(), media_type=LOG_MEDIA_TYPE, headers={"Cache-Control": "no-store"})
+        if not log_path:
+            return ""
+        return StreamingResponse(
+            stream_log_tail(log_path),
+            media_type=LOG_MEDIA_TYPE,
+            headers={"Cache-Control": "no-store"},
+        )
+    if live:
+        return FastJSONResponse(job.read_chunk(since, file))
     if not log_path:
-        return ""
-    return read_log_tail(log_path)
+        return FastJSONResponse({"offset": 0, "file": None, "reset": True, "data": ""})
+    return FastJSONResponse(read_log_chunk(log_path, since, file))
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=5001)
+    # uvloop has no Windows build; fall back to uvicorn's defaults where either is missing
+    loop = "uvloop" if find_spec("uvloop") else "auto"
+    http = "httptools" if find_spec("httptools") else "auto"
+    uvicorn.run(app, host="0.0.0.0", port=5001, loop=loop, http=http, workers=1)
 
 
@@ -6,17 +6,68 @@ Simple script to get you up and running quickly
 
 import os
 import sys
-import json
-import subprocess
+import runpy
+import argparse
+from importlib.util import find_spec
 from pathlib import Path
 
+_BANNER = "\n".join([
+    "\n" + "="*60,
+    "🤖  AI DESKTOP CONTROLLER - QUICK START",
+    "="*60,
+    "Real Linux desktop automation with OpenAI integration",
+    "",
+]) + "\n"
+
+_MENU = "\n".join([
+    "\n📋 What would you like to do?",
+    "",
+    "1. 🌐 Start Web Interface (Recommended)",
+    "2. 🎯 Execute a Specific Task",
+    "3. 🧠 Start Autonomous Mode",
+    "4. 📸 Take Screenshot & Analyze",
+    "5. ⚙️  Run Setup",
+    "6. 📖 Show Help",
+    "7. 🚪 Exit",
+    "",
+]) + "\n"
+
+_HELP = "\n".join([
+    "\n📖 AI Desktop Controller Help",
+    "="*40,
+    "",
+    "🔧 Setup:",
+    "   1. Run setup.py to install dependencies",
+    "   2. Get OpenAI API key from https://platform.openai.com/",
+    "   3. Add API key to config.json",
+    "",
+    "🎮 Usage Modes:",
+    "   • Web Interface: Best for beginners and monitoring",
+    "   • Task Execution: Give AI specific instructions",
+    "   • Autonomous: Let AI explore your desktop",
+    "   • Screenshot: Analyze current desktop state",
+    "",
+    "🛡️  Safety:",
+    "   • Emergency stop: Move mouse to top-left corner",
+    "   • All actions are logged in logs/ directory",
+    "   • Rate limiting prevents excessive actions",
+    "",
+    "📁 Important Files:",
+    "   • config.json - Configuration settings",
+    "   • logs/ - Activity logs",
+    "   • screenshots/ - AI screenshots",
+    "",
+    "🆘 Troubleshooting:",
+    "   • Check logs/ for error details",
+    "   • Ensure DISPLAY environment variable is set",
+    "   • Verify OpenAI API key is valid",
+    "",
+]) + "\n"
+
 def print_banner():
     """Print welcome banner"""
-    print("\n" + "="*60)
-    print("🤖  AI DESKTOP CONTROLLER - QUICK START")
-    print("="*60)
-    print("Real Linux desktop automation with OpenAI integration")
-    print()
+    sys.stdout.write(_BANNER)
+    sys.stdout.flush()
 
 def check_requirements():
     """Check if basic requirements are met"""
@@ -33,21 +84,20 @@ def check_requirements():
         issues.append("config.json not found - run setup.py first")
     else:
         try:
-            with open("config.json") as f:
-                config = json.load(f)
-                if not config.get("openai", {}).get("api_key"):
-                    issues.append("OpenAI API key not configured in config.json")
+            try:
+                import orjson as _json
+            except ImportError:
+                import json as _json
+            config = _json.loads(Path("config.json").read_bytes())
+            if not config.get("openai", {}).get("api_key"):
+                issues.append("OpenAI API key not configured in config.json")
         except Exception as e:
             issues.append(f"Error reading config.json: {e}")
 
-    # Check core dependencies
-    try:
-        import openai
-        import pyautogui
-        import cv2
-        import PIL
-    except ImportError as e:
-        issues.append(f"Missing Python dependencies: {e}")
+    # Check core dependencies without importing them
+    missing = [m for m in ("openai", "pyautogui", "cv2", "PIL") if find_spec(m) is None]
+    if missing:
+        issues.append(f"Missing Python dependencies: {', '.join(missing)}")
         issues.append("Run: pip install -r requirements.txt")
 
     # Check display
@@ -69,16 +119,19 @@ def check_requirements():
 
 def show_menu():
     """Show main menu options"""
-    print("\n📋 What would you like to do?")
-    print()
-    print("1. 🌐 Start Web Interface (Recommended)")
-    print("2. 🎯 Execute a Specific Task")
-    print("3. 🧠 Start Autonomous Mode")
-    print("4. 📸 Take Screenshot & Analyze")
-    print("5. ⚙️  Run Setup")
-    print("6. 📖 Show Help")
-    print("7. 🚪 Exit")
-    print()
+    sys.stdout.write(_MENU)
+    sys.stdout.flush()
+
+def run_script(script, *args):
+    """Run a project script in this interpreter, reusing already-imported modules"""
+    saved_argv = sys.argv
+    sys.argv = [script, *args]
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        pass
+    finally:
+        sys.argv = saved_argv
 
 def start_web_interface():
     """Start the web interface"""
@@ -87,27 +140,29 @@ def start_web_interface():
     print("   • Press Ctrl+C to stop the server")
     print()
 
-    try:
-        subprocess.run([sys.executable, "web_interface.py"])
-    except KeyboardInterrupt:
-        print("\n👋 Web interface stopped")
-    except FileNotFoundError:
+    if not Path("web_interface.py").exists():
         print("❌ web_interface.py not found")
-    except Exception as e:
+        return
+
+    # The server runs until stopped, so hand this process over to it
+    sys.stdout.flush()
+    try:
+        os.execv(sys.executable, [sys.executable, "web_interface.py"])
+    except OSError as e:
         print(f"❌ Error starting web interface: {e}")
 
-def execute_task():
+def execute_task(task=None):
     """Execute a specific task"""
     print("🎯 Task Execution Mode")
     print()
-    print("Examples:")
-    print("  • 'open firefox and go to google.com'")
-    print("  • 'take a screenshot of the desktop'")
-    print("  • 'open terminal and run ls command'")
-    print("  • 'find and open the calculator app'")
-    print()
-
-    task = input("Enter your task: ").strip()
+    if not task:
+        print("Examples:")
+        print("  • 'open firefox and go to google.com'")
+        print("  • 'take a screenshot of the desktop'")
+        print("  • 'open terminal and run ls command'")
+        print("  • 'find and open the calculator app'")
+        print()
+        task = input("Enter your task: ").strip()
     if not task:
         print("❌ No task entered")
         return
@@ -116,12 +171,9 @@ def execute_task():
     print("   (This may take a few moments...)")
 
     try:
-        subprocess.run([
-            sys.executable,
-            "ai_desktop_controller.py",
-            "--task",
-            task
-        ])
+        run_script("ai_desktop_controller.py", "--task", task)
+    except KeyboardInterrupt:
+        print("\n🛑 Task stopped")
     except FileNotFoundError:
         print("❌ ai_desktop_controller.py not found")
     except Exception as e:
@@ -145,7 +197,7 @@ def start_autonomous():
     print("🚀 Starting autonomous mode...")
 
     try:
-        subprocess.run([sys.executable, "ai_desktop_controller.py", "--autonomous"])
+        run_script("ai_desktop_controller.py", "--autonomous")
     except KeyboardInterrupt:
         print("\n🛑 Autonomous mode stopped")
     except FileNotFoundError:
@@ -159,7 +211,7 @@ def take_screenshot():
     print("   Taking screenshot and analyzing with AI...")
 
     try:
-        subprocess.run([sys.executable, "ai_desktop_controller.py", "--screenshot"])
+        run_script("ai_desktop_controller.py", "--screenshot")
     except FileNotFoundError:
         print("❌ ai_desktop_controller.py not found")
     except Exception as e:
@@ -170,7 +222,7 @@ def run_setup():
     print("⚙️  Running setup...")
 
     try:
-        subprocess.run([sys.executable, "setup.py"])
+        run_script("setup.py")
     except FileNotFoundError:
         print("❌ setup.py not found")
     except Exception as e:
@@ -178,45 +230,48 @@ def run_setup():
 
 def show_help():
     """Show help information"""
-    print("\n📖 AI Desktop Controller Help")
-    print("="*40)
-    print()
-    print("🔧 Setup:")
-    print("   1. Run setup.py to install dependencies")
-    print("   2. Get OpenAI API key from https://platform.openai.com/")
-    print("   3. Add API key to config.json")
-    print()
-    print("🎮 Usage Modes:")
-    print("   • Web Interface: Best for beginners and monitoring")
-    print("   • Task Execution: Give AI specific instructions")
-    print("   • Autonomous: Let AI explore your desktop")
-    print("   • Screenshot: Analyze current desktop state")
-    print()
-    print("🛡️  Safety:")
-    print("   • Emergency stop: Move mouse to top-left corner")
-    print("   • All actions are logged in logs/ directory")
-    print("   • Rate limiting prevents excessive actions")
-    print()
-    print("📁 Important Files:")
-    print("   • config.json - Configuration settings")
-    print("   • logs/ - Activity logs")
-    print("   • screenshots/ - AI screenshots")
-    print()
-    print("🆘 Troubleshooting:")
-    print("   • Check logs/ for error details")
-    print("   • Ensure DISPLAY environment variable is set")
-    print("   • Verify OpenAI API key is valid")
-    print()
+    sys.stdout.write(_HELP)
+    sys.stdout.flush()
+
+COMMANDS = {
+    "web": start_web_interface,
+    "task": execute_task,
+    "autonomous": start_autonomous,
+    "screenshot": take_screenshot,
+    "setup": run_setup,
+    "help": show_help,
+}
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="AI Desktop Controller - Quick Start")
+    parser.add_argument("command", nargs="?", choices=list(COMMANDS),
+                        help="Run one action directly instead of showing the menu")
+    parser.add_argument("task", nargs="*", help="Task text for the 'task' command")
+    return parser.parse_args()
 
 def main():
     """Main program loop"""
+    args = parse_args()
     print_banner()
 
+    # Setup and help don't need a working install
+    if args.command in ("setup", "help"):
+        COMMANDS[args.command]()
+        return
+
     # Check if we can run
     if not check_requirements():
         print("\n💡 Fix the issues above and try again.")
         sys.exit(1)
 
+    if args.command == "task":
+        execute_task(" ".join(args.task))
+        return
+    if args.command:
+        COMMANDS[args.command]()
+        return
+
     # Main menu loop
     while True:
         show_menu()
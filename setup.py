@@ -8,11 +8,20 @@ import os
 import sys
 import subprocess
 import platform
+import re
 import json
+import shlex
 import shutil
+import time
+import threading
+import functools
+import hashlib
+import importlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
 from pathlib import Path
-import pkg_resources
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 class Colors:
     """ANSI color codes for terminal output"""
@@ -26,9 +35,154 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
+# pip versions older than this get upgraded before installing requirements
+MIN_PIP_VERSION = (23, 1)
+PIP_CACHE_DIR = Path.home() / ".cache" / "ai-desktop-pip"
+UV_CACHE_DIR = Path.home() / ".cache" / "ai-desktop-uv"
+# Holds the requirements hash of the last install that passed test_installation
+INSTALL_MARKER = Path.home() / ".cache" / "ai-desktop-setup" / "installed.key"
+# Package downloads the package manager may run at once
+PARALLEL_DOWNLOADS = 10
+PACMAN_CONF = "/etc/pacman.conf"
+# Package lists refreshed more recently than this aren't refreshed again
+PACKAGE_LIST_MAX_AGE = 3600
+PACKAGE_LIST_PATHS = {
+    'apt': [Path("/var/lib/apt/periodic/update-success-stamp"), Path("/var/lib/apt/lists"),
+            Path("/var/cache/apt/pkgcache.bin")],
+    'dnf': [Path("/var/cache/dnf")],
+    'yum': [Path("/var/cache/yum")],
+    'zypper': [Path("/var/cache/zypp/raw")],
+}
+
+# Default config.json contents; only the API key is filled in per run
+_DEFAULT_CONFIG = {
+    "openai": {
+        "api_key": "",
+        "model": "gpt-4o-mini",
+        "max_tokens": 1000,
+        "temperature": 0.1,
+        "timeout": 30
+    },
+    "desktop": {
+        "screenshot_quality": 85,
+        "max_screenshot_size": [1920, 1080],
+        "click_delay": 0.2,
+        "type_delay": 0.05,
+        "safety_mode": True,
+        "failsafe_enabled": True,
+        "save_screenshots": False,
+        "screenshot_interval": 2.0
+    },
+    "ai": {
+        "autonomous_mode": False,
+        "decision_interval": 3.0,
+        "max_thinking_time": 15.0,
+        "confidence_threshold": 0.7,
+        "max_iterations_per_task": 20,
+        "exploration_probability": 0.3,
+        "max_concurrent_requests": 2,
+        "skip_unchanged_frames": True
+    },
+    "safety": {
+        "max_actions_per_minute": 25,
+        "restricted_areas": [
+            {"x": 0, "y": 0, "width": 50, "height": 50, "reason": "top-left failsafe corner"}
+        ],
+        "forbidden_applications": [
+            "sudo",
+            "rm",
+            "passwd",
+            "system-settings"
+        ],
+        "require_confirmation": [
+            "shutdown",
+            "reboot",
+            "delete",
+            "format"
+        ]
+    },
+    "logging": {
+        "level": "INFO",
+        "max_log_files": 10,
+        "screenshot_logging": True,
+        "action_logging": True,
+        "ai_response_logging": True
+    },
+    "interface": {
+        "show_mouse_trail": True,
+        "highlight_clicks": True,
+        "show_ai_thinking": True,
+        "voice_feedback": False,
+        "web_interface_port": 8080
+    },
+    "experimental": {
+        "ocr_enabled": True,
+        "object_detection": False,
+        "learning_mode": False,
+        "memory_persistence": True
+    }
+}
+
+# orjson is only there on re-runs, after requirements are installed
+try:
+    import orjson
+    _CONFIG_TEMPLATE_JSON = orjson.dumps(_DEFAULT_CONFIG, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    _CONFIG_TEMPLATE_JSON = json.dumps(_DEFAULT_CONFIG, indent=2)
+
+class OutputBuffer:
+    """Collects terminal output and writes it out in one go"""
+
+    def __init__(self, held: bool = False):
+        self.parts: List[str] = []
+        # A held buffer keeps everything until release(), so background steps don't interleave
+        self.held = held
+        self.lock = threading.Lock()
+
+    def emit(self, message: str, color: Optional[str] = None) -> None:
+        with self.lock:
+            if color is None:
+                self.parts.append(f"{message}\n")
+            else:
+                self.parts.append(f"{color}{message}{Colors.END}\n")
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.held:
+                return
+            if self.parts:
+                sys.stdout.write("".join(self.parts))
+                self.parts.clear()
+            sys.stdout.flush()
+
+    def release(self) -> None:
+        with self.lock:
+            self.held = False
+        self.flush()
+
+_OUTPUT = OutputBuffer()
+_thread_output = threading.local()
+
+def current_output() -> OutputBuffer:
+    """Output buffer for the calling thread"""
+    return getattr(_thread_output, 'buffer', _OUTPUT)
+
+def flush_output() -> None:
+    """Write out everything printed so far"""
+    current_output().flush()
+
+def prompt(message: str) -> str:
+    """Flush pending output, then ask the user for input"""
+    flush_output()
+    return input(message)
+
+def print_plain(message: str = "") -> None:
+    """Print uncolored message to terminal"""
+    current_output().emit(message)
+
 def print_colored(message: str, color: str = Colors.WHITE) -> None:
     """Print colored message to terminal"""
-    print(f"{color}{message}{Colors.END}")
+    current_output().emit(message, color)
 
 def print_header(title: str) -> None:
     """Print a formatted header"""
@@ -52,15 +206,88 @@ def print_error(message: str) -> None:
     """Print error message"""
     print_colored(f"❌ {message}", Colors.RED)
 
+def run_streaming(cmd: List[str], tail_lines: int = 200) -> Tuple[int, str]:
+    """Run a command, echoing its output as it arrives; returns (returncode, output tail)"""
+    tail = deque(maxlen=tail_lines)
+    flush_output()
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          bufsize=1, text=True) as proc:
+        for line in proc.stdout:
+            tail.append(line)
+            print_plain(f"    {line.rstrip()}")
+            flush_output()
+    return proc.returncode, "".join(tail).strip()
+
+def write_if_changed(path, content: str, mode: Optional[int] = None) -> bool:
+    """Write a text file unless it already has this content; returns True if written"""
+    data = content.encode()
+    try:
+        with open(path, 'rb') as f:
+            unchanged = f.read() == data
+    except OSError:
+        unchanged = False
+
+    if not unchanged:
+        with open(path, 'wb') as f:
+            f.write(data)
+    if mode is not None and (not unchanged or os.stat(path).st_mode & 0o777 != mode):
+        os.chmod(path, mode)
+    return not unchanged
+
+@functools.lru_cache(maxsize=1)
+def path_binaries() -> frozenset:
+    """Names of everything on $PATH, from one listing of each directory"""
+    names = set()
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        try:
+            names.update(os.listdir(directory or '.'))
+        except OSError:
+            continue
+    return frozenset(names)
+
+@functools.lru_cache(maxsize=1)
+def detect_linux_distro() -> str:
+    """Detect Linux distribution"""
+    try:
+        text = Path('/etc/os-release').read_text()
+    except OSError:
+        text = None
+
+    if text is not None:
+        fields = {}
+        for line in text.splitlines():
+            try:
+                tokens = shlex.split(line, comments=True)
+            except ValueError:
+                continue
+            if tokens and '=' in tokens[0]:
+                key, value = tokens[0].split('=', 1)
+                fields[key] = value
+        if fields.get('ID'):
+            return fields['ID'].lower()
+
+    # Fallback detection methods
+    if 'apt' in path_binaries():
+        return 'ubuntu'
+    elif 'yum' in path_binaries() or 'dnf' in path_binaries():
+        return 'fedora'
+    elif 'pacman' in path_binaries():
+        return 'arch'
+    elif 'zypper' in path_binaries():
+        return 'opensuse'
+    else:
+        return 'unknown'
+
 class AIDesktopSetup:
     """Main setup class for AI Desktop Controller"""
 
     def __init__(self):
         self.python_version = sys.version_info
         self.platform = platform.system().lower()
-        self.distro = self.get_linux_distro()
-        self.requirements_file = Path("requirements.txt")
-        self.config_file = Path("config.json")
+        self.distro = detect_linux_distro()
+        self.requirements_file = "requirements.txt"
+        self.config_file = "config.json"
+        self.force_refresh = False
 
         # Required directories
         self.directories = [
@@ -80,29 +307,23 @@ class AIDesktopSetup:
             'opensuse': ['python3-tk', 'python3-devel', 'wmctrl', 'xdotool', 'scrot', 'tesseract-ocr']
         }
 
-    def get_linux_distro(self) -> str:
-        """Detect Linux distribution"""
-        try:
-            with open('/etc/os-release', 'r') as f:
-                lines = f.readlines()
-                for line in lines:
-                    if line.startswith('ID='):
-                        distro = line.split('=')[1].strip().strip('"')
-                        return distro.lower()
-        except:
-            pass
-
-        # Fallback detection methods
-        if shutil.which('apt'):
-            return 'ubuntu'
-        elif shutil.which('yum') or shutil.which('dnf'):
-            return 'fedora'
-        elif shutil.which('pacman'):
-            return 'arch'
-        elif shutil.which('zypper'):
-            return 'opensuse'
+        # Package manager commands per distro: (manager, list refresh, install prefix)
+        apt_install = 'apt-fast' if 'apt-fast' in path_binaries() else 'apt'
+        apt = ('apt', ['apt', 'update'], ['sudo', apt_install, 'install', '-y'])
+        if 'dnf' in path_binaries():
+            rpm = ('dnf', ['dnf', 'makecache'],
+                   ['sudo', 'dnf', 'install', '-y', f'--setopt=max_parallel_downloads={PARALLEL_DOWNLOADS}'])
         else:
-            return 'unknown'
+            rpm = ('yum', ['yum', 'makecache'], ['sudo', 'yum', 'install', '-y'])
+        self.package_commands: Dict[str, tuple] = {
+            'ubuntu': apt,
+            'debian': apt,
+            'fedora': rpm,
+            'centos': rpm,
+            # No separate -Sy: syncing without upgrading risks a partial upgrade
+            'arch': ('pacman', None, ['sudo', 'pacman', '-S', '--noconfirm']),
+            'opensuse': ('zypper', ['zypper', 'refresh'], ['sudo', 'zypper', 'install', '-y']),
+        }
 
     def check_system_requirements(self) -> bool:
         """Check if system meets requirements"""
@@ -131,25 +352,95 @@ class AIDesktopSetup:
             print_success(f"Display: {os.environ.get('DISPLAY')}")
 
         # Check for X11
-        if not shutil.which('xrandr'):
+        if 'xrandr' not in path_binaries():
             print_warning("xrandr not found. Some screen detection features may not work.")
         else:
             print_success("X11 tools available")
 
         return success
 
+    def is_package_installed(self, package: str) -> bool:
+        """Check if a system package is installed, without root"""
+        if self.distro in ['ubuntu', 'debian']:
+            cmd = ['dpkg-query', '-W', '-f=${Status}', package]
+        elif self.distro in ['fedora', 'centos', 'opensuse']:
+            cmd = ['rpm', '-q', '--whatprovides', package]
+        elif self.distro == 'arch':
+            cmd = ['pacman', '-T', package]
+        else:
+            return False
+
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        except OSError:
+            return False
+        if result.returncode != 0:
+            return False
+        # dpkg-query also knows removed packages; the last status word says if it's present
+        return cmd[0] != 'dpkg-query' or result.stdout.split()[-1:] == ['installed']
+
+    def package_lists_fresh(self, manager: str) -> bool:
+        """Check if the package manager's lists were refreshed within PACKAGE_LIST_MAX_AGE"""
+        if self.force_refresh:
+            return False
+        for path in PACKAGE_LIST_PATHS.get(manager, []):
+            try:
+                if time.time() - path.stat().st_mtime < PACKAGE_LIST_MAX_AGE:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def refresh_package_lists(self, manager: str, cmd: List[str]) -> None:
+        """Refresh package lists unless they are fresh already"""
+        if not self.package_lists_fresh(manager):
+            returncode, _ = run_streaming(['sudo'] + cmd)
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, ['sudo'] + cmd)
+
+    def enable_pacman_parallel_downloads(self) -> None:
+        """Turn on ParallelDownloads in pacman.conf, keeping a backup of the original"""
+        try:
+            with open(PACMAN_CONF) as f:
+                text = f.read()
+        except OSError:
+            return
+
+        setting = re.search(r'^[ \t]*ParallelDownloads[ \t]*=[ \t]*(\d+).*$', text, re.MULTILINE)
+        if setting and int(setting.group(1)) > 1:
+            return
+
+        line = f"ParallelDownloads = {PARALLEL_DOWNLOADS}"
+        # Replace the active or commented-out entry; otherwise add it to [options]
+        existing = setting or re.search(r'^[ \t]*#[ \t]*ParallelDownloads\b.*$', text, re.MULTILINE)
+        if existing:
+            text = text[:existing.start()] + line + text[existing.end():]
+        elif re.search(r'^\[options\][ \t]*$', text, re.MULTILINE):
+            text = re.sub(r'^\[options\][ \t]*$', lambda m: f"{m.group(0)}\n{line}", text,
+                          count=1, flags=re.MULTILINE)
+        else:
+            return
+
+        try:
+            subprocess.run(['sudo', 'cp', '-p', PACMAN_CONF, PACMAN_CONF + '.bak'], check=True)
+            subprocess.run(['sudo', 'tee', PACMAN_CONF], input=text, text=True,
+                           stdout=subprocess.DEVNULL, check=True)
+            print_plain(f"Enabled {line} in {PACMAN_CONF} (backup in {PACMAN_CONF}.bak)")
+        except (OSError, subprocess.CalledProcessError) as e:
+            print_warning(f"Could not enable parallel downloads in {PACMAN_CONF}: {e}")
+
     def install_system_packages(self) -> bool:
         """Install required system packages"""
         print_step("Installing system packages...")
 
         if self.distro == 'unknown':
             print_warning("Unknown Linux distribution. Please install these packages manually:")
-            print("  - python3-tk (or tkinter)")
-            print("  - python3-dev")
-            print("  - wmctrl")
-            print("  - xdotool")
-            print("  - scrot")
-            print("  - tesseract-ocr")
+            print_plain("  - python3-tk (or tkinter)")
+            print_plain("  - python3-dev")
+            print_plain("  - wmctrl")
+            print_plain("  - xdotool")
+            print_plain("  - scrot")
+            print_plain("  - tesseract-ocr")
             return True
 
         packages = self.system_packages.get(self.distro, [])
@@ -157,30 +448,34 @@ class AIDesktopSetup:
             print_warning(f"No package list for {self.distro}. Manual installation may be required.")
             return True
 
+        # Only hand the package manager what's actually missing
+        with ThreadPoolExecutor(max_workers=len(packages)) as pool:
+            installed = list(pool.map(self.is_package_installed, packages))
+        packages = [p for p, ok in zip(packages, installed) if not ok]
+        if not packages:
+            print_success("System packages already installed")
+            return True
+
+        if self.distro not in self.package_commands:
+            print_warning(f"Unsupported distribution: {self.distro}")
+            return True
+        manager, refresh, install = self.package_commands[self.distro]
+
         try:
-            if self.distro in ['ubuntu', 'debian']:
-                cmd = ['sudo', 'apt', 'update']
-                subprocess.run(cmd, check=True, capture_output=True)
-                cmd = ['sudo', 'apt', 'install', '-y'] + packages
-            elif self.distro in ['fedora', 'centos']:
-                package_manager = 'dnf' if shutil.which('dnf') else 'yum'
-                cmd = ['sudo', package_manager, 'install', '-y'] + packages
-            elif self.distro == 'arch':
-                cmd = ['sudo', 'pacman', '-S', '--noconfirm'] + packages
-            elif self.distro == 'opensuse':
-                cmd = ['sudo', 'zypper', 'install', '-y'] + packages
-            else:
-                print_warning(f"Unsupported distribution: {self.distro}")
-                return True
+            if refresh:
+                self.refresh_package_lists(manager, refresh)
+            if manager == 'pacman':
+                self.enable_pacman_parallel_downloads()
+            cmd = install + packages
 
-            print(f"Running: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            print_plain(f"Running: {' '.join(cmd)}")
+            returncode, output = run_streaming(cmd)
 
-            if result.returncode == 0:
+            if returncode == 0:
                 print_success("System packages installed successfully")
                 return True
             else:
-                print_error(f"Failed to install system packages: {result.stderr}")
+                print_error(f"Failed to install system packages: {output}")
                 return False
 
         except subprocess.CalledProcessError as e:
@@ -190,32 +485,81 @@ class AIDesktopSetup:
             print_error("Package manager not found. Please install packages manually.")
             return False
 
+    def pip_is_recent(self) -> bool:
+        """Check if the installed pip is at least MIN_PIP_VERSION"""
+        try:
+            version = metadata.version('pip')
+        except metadata.PackageNotFoundError:
+            return False
+        parts = []
+        for part in version.split('.')[:2]:
+            digits = ''.join(c for c in part if c.isdigit())
+            parts.append(int(digits) if digits else 0)
+        return tuple(parts) >= MIN_PIP_VERSION
+
+    def find_uv(self) -> Optional[List[str]]:
+        """Locate the uv installer, bootstrapping it with pip on first use"""
+        uv = shutil.which('uv')
+        if uv:
+            return [uv]
+
+        uv_module = [sys.executable, '-m', 'uv']
+        try:
+            if subprocess.run(uv_module + ['--version'], capture_output=True).returncode == 0:
+                return uv_module
+
+            result = subprocess.run([sys.executable, '-m', 'pip', 'install', '--prefer-binary',
+                                     '--cache-dir', str(PIP_CACHE_DIR), 'uv'],
+                                    capture_output=True)
+        except OSError:
+            return None
+        return uv_module if result.returncode == 0 else None
+
     def install_python_packages(self) -> bool:
         """Install Python packages from requirements.txt"""
         print_step("Installing Python packages...")
 
-        if not self.requirements_file.exists():
+        if not os.path.isfile(self.requirements_file):
             print_error(f"Requirements file not found: {self.requirements_file}")
             return False
 
-        try:
-            # Upgrade pip first
-            subprocess.run([sys.executable, '-m', 'pip', 'install', '--upgrade', 'pip'],
-                         check=True, capture_output=True)
-
-            # Install requirements
-            cmd = [sys.executable, '-m', 'pip', 'install', '-r', str(self.requirements_file)]
-            print(f"Running: {' '.join(cmd)}")
-
-            result = subprocess.run(cmd, capture_output=True, text=True)
+        # Don't ask PyPI whether pip itself is outdated on every call
+        os.environ['PIP_DISABLE_PIP_VERSION_CHECK'] = '1'
 
-            if result.returncode == 0:
+        try:
+            # uv resolves and downloads in parallel; pip stays as the fallback
+            uv = self.find_uv()
+            if uv:
+                cmd = uv + ['pip', 'install', '--python', sys.executable,
+                            '--cache-dir', str(UV_CACHE_DIR), '-r', self.requirements_file]
+                print_plain(f"Running: {' '.join(cmd)}")
+                returncode, output = run_streaming(cmd)
+
+                if returncode == 0:
+                    print_success("Python packages installed successfully")
+                    return True
+                print_warning(f"uv install failed, falling back to pip: {output}")
+
+            # Upgrade pip first, unless it's already recent enough
+            if not self.pip_is_recent():
+                upgrade = [sys.executable, '-m', 'pip', 'install', '--upgrade', 'pip']
+                returncode, _ = run_streaming(upgrade)
+                if returncode != 0:
+                    raise subprocess.CalledProcessError(returncode, upgrade)
+
+            # Install requirements, reusing wheels cached by earlier runs
+            cmd = [sys.executable, '-m', 'pip', 'install', '--prefer-binary',
+                   '--cache-dir', str(PIP_CACHE_DIR), '-r', self.requirements_file]
+            print_plain(f"Running: {' '.join(cmd)}")
+            returncode, output = run_streaming(cmd)
+
+            if returncode == 0:
                 print_success("Python packages installed successfully")
                 return True
             else:
-                print_error(f"Failed to install Python packages: {result.stderr}")
-                print("You can try installing manually with:")
-                print(f"  pip install -r {self.requirements_file}")
+                print_error(f"Failed to install Python packages: {output}")
+                print_plain("You can try installing manually with:")
+                print_plain(f"  pip install -r {self.requirements_file}")
                 return False
 
         except subprocess.CalledProcessError as e:
@@ -228,8 +572,12 @@ class AIDesktopSetup:
 
         try:
             for directory in self.directories:
-                Path(directory).mkdir(exist_ok=True)
-                print(f"  Created: {directory}")
+                # One stat on re-runs instead of a mkdir that fails with EEXIST
+                if os.path.isdir(directory):
+                    print_plain(f"  Exists: {directory}")
+                    continue
+                os.makedirs(directory, exist_ok=True)
+                print_plain(f"  Created: {directory}")
 
             print_success("Directories created successfully")
             return True
@@ -241,90 +589,26 @@ class AIDesktopSetup:
         """Set up configuration file"""
         print_step("Setting up configuration...")
 
-        if self.config_file.exists():
+        if os.path.isfile(self.config_file):
             print_warning(f"Config file already exists: {self.config_file}")
-            response = input("Do you want to overwrite it? (y/N): ").lower().strip()
+            response = prompt("Do you want to overwrite it? (y/N): ").lower().strip()
             if response != 'y':
-                print("Using existing configuration.")
+                print_plain("Using existing configuration.")
                 return True
 
         # Get OpenAI API key
-        api_key = input(f"{Colors.YELLOW}Enter your OpenAI API key (or press Enter to skip): {Colors.END}").strip()
-
-        config = {
-            "openai": {
-                "api_key": api_key,
-                "model": "gpt-4-vision-preview",
-                "max_tokens": 1000,
-                "temperature": 0.1,
-                "timeout": 30
-            },
-            "desktop": {
-                "screenshot_quality": 85,
-                "max_screenshot_size": [1920, 1080],
-                "click_delay": 0.2,
-                "type_delay": 0.05,
-                "safety_mode": True,
-                "failsafe_enabled": True,
-                "screenshot_interval": 2.0
-            },
-            "ai": {
-                "autonomous_mode": False,
-                "decision_interval": 3.0,
-                "max_thinking_time": 15.0,
-                "confidence_threshold": 0.7,
-                "max_iterations_per_task": 20,
-                "exploration_probability": 0.3
-            },
-            "safety": {
-                "max_actions_per_minute": 25,
-                "restricted_areas": [
-                    {"x": 0, "y": 0, "width": 50, "height": 50, "reason": "top-left failsafe corner"}
-                ],
-                "forbidden_applications": [
-                    "sudo",
-                    "rm",
-                    "passwd",
-                    "system-settings"
-                ],
-                "require_confirmation": [
-                    "shutdown",
-                    "reboot",
-                    "delete",
-                    "format"
-                ]
-            },
-            "logging": {
-                "level": "INFO",
-                "max_log_files": 10,
-                "screenshot_logging": True,
-                "action_logging": True,
-                "ai_response_logging": True
-            },
-            "interface": {
-                "show_mouse_trail": True,
-                "highlight_clicks": True,
-                "show_ai_thinking": True,
-                "voice_feedback": False,
-                "web_interface_port": 8080
-            },
-            "experimental": {
-                "ocr_enabled": True,
-                "object_detection": False,
-                "learning_mode": False,
-                "memory_persistence": True
-            }
-        }
+        api_key = prompt(f"{Colors.YELLOW}Enter your OpenAI API key (or press Enter to skip): {Colors.END}").strip()
 
         try:
+            text = _CONFIG_TEMPLATE_JSON.replace('"api_key": ""', f'"api_key": {json.dumps(api_key)}', 1)
             with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=2)
+                f.write(text)
 
             print_success(f"Configuration saved to {self.config_file}")
 
             if not api_key:
                 print_warning("No OpenAI API key provided.")
-                print(f"Please edit {self.config_file} and add your API key to get started.")
+                print_plain(f"Please edit {self.config_file} and add your API key to get started.")
 
             return True
 
@@ -332,10 +616,38 @@ class AIDesktopSetup:
             print_error(f"Error creating configuration: {e}")
             return False
 
+    def installation_key(self) -> Optional[str]:
+        """Hash of requirements.txt and the interpreter it was installed into"""
+        try:
+            with open(self.requirements_file, 'rb') as f:
+                digest = hashlib.sha256(f.read())
+        except OSError:
+            return None
+        digest.update(sys.executable.encode())
+        return digest.hexdigest()
+
+    def save_installation_key(self, key: str) -> None:
+        """Record a passing installation test for this requirements.txt"""
+        try:
+            INSTALL_MARKER.parent.mkdir(parents=True, exist_ok=True)
+            tmp = INSTALL_MARKER.with_suffix('.tmp')
+            tmp.write_text(key)
+            os.replace(tmp, INSTALL_MARKER)
+        except OSError as e:
+            print_warning(f"Could not save installation marker: {e}")
+
     def test_installation(self) -> bool:
         """Test if installation works"""
         print_step("Testing installation...")
 
+        key = self.installation_key()
+        try:
+            if key and not self.force_refresh and INSTALL_MARKER.read_text() == key:
+                print_success("Installation test cached (requirements.txt unchanged)")
+                return True
+        except OSError:
+            pass
+
         try:
             # Test importing required modules
             test_imports = [
@@ -348,18 +660,22 @@ class AIDesktopSetup:
                 'flask'
             ]
 
+            # Extension loading mostly releases the GIL, so import them side by side
+            with ThreadPoolExecutor(max_workers=len(test_imports)) as pool:
+                futures = [pool.submit(importlib.import_module, module) for module in test_imports]
+
             failed_imports = []
-            for module in test_imports:
-                try:
-                    __import__(module)
-                    print(f"  ✓ {module}")
-                except ImportError:
+            for module, future in zip(test_imports, futures):
+                if isinstance(future.exception(), ImportError):
                     failed_imports.append(module)
                     print_error(f"  ✗ {module}")
+                else:
+                    future.result()
+                    print_plain(f"  ✓ {module}")
 
             if failed_imports:
                 print_error(f"Failed to import: {', '.join(failed_imports)}")
-                print("Try running: pip install -r requirements.txt")
+                print_plain("Try running: pip install -r requirements.txt")
                 return False
 
             # Test basic functionality
@@ -371,6 +687,8 @@ class AIDesktopSetup:
                 print_warning(f"Screen detection issue: {e}")
 
             print_success("Installation test completed")
+            if key:
+                self.save_installation_key(key)
             return True
 
         except Exception as e:
@@ -383,7 +701,7 @@ class AIDesktopSetup:
 
         try:
             # Main launcher script
-            launcher_script = \"\"\"#!/bin/bash
+            launcher_script = """#!/bin/bash
 # AI Desktop Controller Launcher Script
 
 echo "🤖 AI Desktop Controller"
@@ -440,14 +758,12 @@ case "$1" in
         echo "  $0 auto"
         ;;
 esac
-\"\"\"
+"""
 
-            with open("launch.sh", "w") as f:
-                f.write(launcher_script)
-            os.chmod("launch.sh", 0o755)
+            write_if_changed("launch.sh", launcher_script, 0o755)
 
             # Desktop entry for GUI
-            desktop_entry = f\"\"\"[Desktop Entry]
+            desktop_entry = f"""[Desktop Entry]
 Version=1.0
 Type=Application
 Name=AI Desktop Controller
@@ -456,17 +772,17 @@ Exec={Path.cwd()}/launch.sh web
 Icon=applications-system
 Terminal=true
 Categories=System;Utility;Development;
-\"\"\"
+"""
 
             desktop_dir = Path.home() / ".local/share/applications"
-            desktop_dir.mkdir(parents=True, exist_ok=True)
+            if not os.path.isdir(desktop_dir):
+                os.makedirs(desktop_dir, exist_ok=True)
 
-            with open(desktop_dir / "ai-desktop-controller.desktop", "w") as f:
-                f.write(desktop_entry)
+            write_if_changed(desktop_dir / "ai-desktop-controller.desktop", desktop_entry)
 
             print_success("Launcher scripts created:")
-            print("  - ./launch.sh (command line)")
-            print("  - Desktop entry (applications menu)")
+            print_plain("  - ./launch.sh (command line)")
+            print_plain("  - Desktop entry (applications menu)")
 
             return True
 
@@ -475,10 +791,10 @@ Categories=System;Utility;Development;
             return False
 
     def print_final_instructions(self) -> None:
-        \"\"\"Print final setup instructions\"\"\"
+        """Print final setup instructions"""
         print_header("🎉 Installation Complete!")
 
-        print_colored("\\n📋 Next Steps:", Colors.BOLD)
+        print_colored("\n📋 Next Steps:", Colors.BOLD)
         print_colored("1. Add your OpenAI API key to config.json", Colors.WHITE)
         print_colored("2. Run the AI Desktop Controller:", Colors.WHITE)
         print_colored("   • Web Interface:  ./launch.sh web", Colors.CYAN)
@@ -486,63 +802,96 @@ Categories=System;Utility;Development;
         print_colored("   • Autonomous:     ./launch.sh auto", Colors.CYAN)
         print_colored("   • Screenshot:     ./launch.sh screenshot", Colors.CYAN)
 
-        print_colored("\\n🔧 Advanced Usage:", Colors.BOLD)
+        print_colored("\n🔧 Advanced Usage:", Colors.BOLD)
         print_colored("   python3 ai_desktop_controller.py --help", Colors.WHITE)
         print_colored("   python3 web_interface.py --help", Colors.WHITE)
 
-        print_colored("\\n📁 Important Files:", Colors.BOLD)
+        print_colored("\n📁 Important Files:", Colors.BOLD)
         print_colored("   config.json       - Configuration", Colors.WHITE)
         print_colored("   logs/            - Activity logs", Colors.WHITE)
         print_colored("   screenshots/     - AI screenshots", Colors.WHITE)
         print_colored("   requirements.txt - Python dependencies", Colors.WHITE)
 
-        print_colored("\\n⚠️  Safety Notes:", Colors.YELLOW)
+        print_colored("\n⚠️  Safety Notes:", Colors.YELLOW)
         print_colored("   • Move mouse to top-left corner for emergency stop", Colors.WHITE)
         print_colored("   • AI actions are limited by safety settings", Colors.WHITE)
         print_colored("   • Review logs regularly for monitoring", Colors.WHITE)
 
-        print_colored("\\n🆘 Troubleshooting:", Colors.BOLD)
+        print_colored("\n🆘 Troubleshooting:", Colors.BOLD)
         print_colored("   • Check logs/ directory for error details", Colors.WHITE)
         print_colored("   • Ensure DISPLAY environment variable is set", Colors.WHITE)
         print_colored("   • Verify OpenAI API key is valid", Colors.WHITE)
         print_colored("   • Run with --debug flag for verbose output", Colors.WHITE)
 
+    def step_finished(self, step_name: str, ok: bool) -> bool:
+        """Report a finished step; returns False if the user chose to stop"""
+        if not ok:
+            print_error(f"Setup step failed: {step_name}")
+        flush_output()
+
+        # Ask if user wants to continue
+        if not ok and sys.stdin.isatty():
+            response = prompt(f"{Colors.YELLOW}Continue anyway? (y/N): {Colors.END}").lower().strip()
+            return response == 'y'
+        return True
+
+    def run_steps(self, steps: List[tuple]) -> Tuple[bool, bool]:
+        """Run setup steps in order; returns (all succeeded, keep going)"""
+        success = True
+        for step_name, step_func in steps:
+            print_header(f"Step: {step_name}")
+            ok = step_func()
+            success = success and ok
+            if not self.step_finished(step_name, ok):
+                return success, False
+        return success, True
+
+    def run_step_in_background(self, output: OutputBuffer, step_name: str, step_func) -> bool:
+        """Run one step on a worker thread, printing into its own buffer"""
+        _thread_output.buffer = output
+        try:
+            print_header(f"Step: {step_name}")
+            return step_func()
+        finally:
+            output.flush()
+
     def run_setup(self) -> bool:
-        \"\"\"Run the complete setup process\"\"\"
+        """Run the complete setup process"""
         print_header("🤖 AI Desktop Controller Setup")
         print_colored("This will install and configure the AI Desktop Controller", Colors.WHITE)
 
         # Confirm setup
         if sys.stdin.isatty():  # Only ask if running interactively
-            response = input(f"\\n{Colors.YELLOW}Continue with setup? (Y/n): {Colors.END}").lower().strip()
+            response = prompt(f"\n{Colors.YELLOW}Continue with setup? (Y/n): {Colors.END}").lower().strip()
             if response and response != 'y' and response != 'yes':
-                print("Setup cancelled.")
+                print_plain("Setup cancelled.")
                 return False
 
-        success = True
-
-        # Run setup steps
-        steps = [
+        # Python packages install in the background while the local file steps run
+        success, proceed = self.run_steps([
             ("System Requirements", self.check_system_requirements),
             ("System Packages", self.install_system_packages),
-            ("Python Packages", self.install_python_packages),
-            ("Directories", self.create_directories),
-            ("Configuration", self.setup_configuration),
-            ("Installation Test", self.test_installation),
-            ("Launcher Scripts", self.create_launcher_scripts)
-        ]
-
-        for step_name, step_func in steps:
-            print_header(f"Step: {step_name}")
-            if not step_func():
-                print_error(f"Setup step failed: {step_name}")
-                success = False
-
-                # Ask if user wants to continue
-                if sys.stdin.isatty():
-                    response = input(f"{Colors.YELLOW}Continue anyway? (y/N): {Colors.END}").lower().strip()
-                    if response != 'y':
-                        break
+        ])
+
+        if proceed:
+            python_output = OutputBuffer(held=True)
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                python_future = pool.submit(self.run_step_in_background, python_output,
+                                            "Python Packages", self.install_python_packages)
+                files_ok, proceed = self.run_steps([
+                    ("Directories", self.create_directories),
+                    ("Configuration", self.setup_configuration),
+                    ("Launcher Scripts", self.create_launcher_scripts),
+                ])
+                python_output.release()
+                python_ok = python_future.result()
+            success = success and files_ok and python_ok
+            if proceed:
+                proceed = self.step_finished("Python Packages", python_ok)
+
+        if proceed:
+            test_ok, _ = self.run_steps([("Installation Test", self.test_installation)])
+            success = success and test_ok
 
         if success:
             self.print_final_instructions()
@@ -552,7 +901,7 @@ Categories=System;Utility;Development;
         return success
 
 def main():
-    \"\"\"Main entry point\"\"\"
+    """Main entry point"""
     import argparse
 
     parser = argparse.ArgumentParser(description="AI Desktop Controller Setup")
@@ -562,9 +911,12 @@ def main():
                        help="Only install Python packages")
     parser.add_argument("--config-only", action="store_true",
                        help="Only setup configuration")
+    parser.add_argument("--force-refresh", action="store_true",
+                       help="Refresh package lists and re-test imports even if nothing changed")
     args = parser.parse_args()
 
     setup = AIDesktopSetup()
+    setup.force_refresh = args.force_refresh
 
     try:
         if args.config_only:
@@ -581,11 +933,13 @@ def main():
             return setup.run_setup()
 
     except KeyboardInterrupt:
-        print_colored("\\n\\n⚠️  Setup interrupted by user", Colors.YELLOW)
+        print_colored("\n\n⚠️  Setup interrupted by user", Colors.YELLOW)
         return False
     except Exception as e:
         print_error(f"Setup failed with error: {e}")
         return False
+    finally:
+        flush_output()
 
 if __name__ == "__main__":
     success = main()
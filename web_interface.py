@@ -5,47 +5,272 @@ Provides a web-based control panel for monitoring and controlling the AI desktop
 """
 
 import os
+
+# gevent is opt-in (WEB_ASYNC_MODE=gevent): it makes idle sockets cheap, but
+# captures, image encoding and the AI loop then share one hub, and their
+# CPU-bound C calls stall every client until they return
+ASYNC_MODE = os.environ.get('WEB_ASYNC_MODE', 'threading')
+if ASYNC_MODE == 'gevent':
+    # gevent has to patch the stdlib before anything else imports it
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        ASYNC_MODE = 'threading'
+else:
+    ASYNC_MODE = 'threading'
+
+import functools
+import io
+import re
 import sys
 import json
+import tempfile
 import time
-import base64
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit, disconnect
 from flask_cors import CORS
+from PIL import Image
 import logging
 
-# Import our AI controller
+# Optional SIMD base64 encoder (same API as the stdlib module)
 try:
-    from ai_desktop_controller import AIDesktopController, DesktopAction
+    import pybase64 as base64
 except ImportError:
-    print("Could not import ai_desktop_controller. Make sure it's in the same directory.")
-    sys.exit(1)
+    import base64
+
+# Optional gzip/brotli response compression
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# Optional faster JSON for responses and request bodies
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; formatting options like indent are ignored"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        try:
+            return orjson.dumps(obj, default=self.default).decode('utf-8')
+        except TypeError:
+            # Types orjson can't take (e.g. namedtuples) still go out through the stdlib encoder
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# The AI controller (OpenAI, OpenCV, ...) is imported in initialize_ai_controller
+if TYPE_CHECKING:
+    from ai_desktop_controller import AIDesktopController
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'ai-desktop-controller-secret-key-2024'
+if orjson is not None:
+    # jsonify and request.get_json both go through app.json
+    app.json = OrjsonProvider(app)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+if Compress is not None:
+    app.config.update(
+        COMPRESS_MIMETYPES=['application/json', 'text/html', 'text/css', 'application/javascript'],
+        COMPRESS_LEVEL=4,
+        COMPRESS_BR_LEVEL=4,
+        # Streamed bodies (the /api/screenshot generator) would otherwise be buffered whole
+        COMPRESS_STREAMS=False,
+    )
+    Compress(app)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE)
 
 # Global variables
-ai_controller: Optional[AIDesktopController] = None
-controller_thread: Optional[threading.Thread] = None
-is_running = False
+ai_controller: Optional["AIDesktopController"] = None
+controller_thread: Optional[Future] = None
+# Set while autonomous mode runs; the lock makes check-and-start atomic across requests
+_autonomous_running = threading.Event()
+_autonomous_lock = threading.Lock()
+# Bumped per run, so a finishing worker only clears state that is still its own
+_autonomous_generation = 0
+# Toggle requests run one at a time, so a restart can wait out the previous worker
+_autonomous_toggle_lock = threading.Lock()
+AUTONOMOUS_STOP_TIMEOUT = 30.0
 clients = set()
+# Sids whose browser can display WebP frames
+_webp_clients = set()
+# Live mode settings per client sid; a sid is present while its stream task runs
+_live_sessions: Dict[str, Dict] = {}
+_live_lock = threading.Lock()
+
+# AI tasks and autonomous mode run on a small shared pool; new tasks are refused past MAX_PENDING_TASKS
+MAX_PENDING_TASKS = 8
+_task_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ai-task')
+_pending_tasks = 0
+_pending_lock = threading.Lock()
 
-# Setup logging for web interface
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def ttl_cache(seconds: float, key: Optional[Callable[[], object]] = None):
+    """Cache a no-argument function's result for `seconds`, or until key() changes"""
+    def decorator(func):
+        lock = threading.Lock()
+        entry = {'t': None, 'key': None, 'value': None}
+
+        @functools.wraps(func)
+        def wrapper():
+            current_key = key() if key else None
+            with lock:
+                if (entry['t'] is not None and time.time() - entry['t'] < seconds
+                        and entry['key'] == current_key):
+                    return entry['value']
+                value = func()
+                entry.update(t=time.time(), key=current_key, value=value)
+                return value
+        return wrapper
+    return decorator
+
+def cached_json(payload: Dict, max_age: int):
+    """JSON response that the requesting browser may reuse for max_age seconds"""
+    response = jsonify(payload)
+    # private: shared proxies must not keep per-install state
+    response.headers['Cache-Control'] = f'private, max-age={max_age}'
+    return response
+
+def public_config(config: Dict) -> Dict:
+    """Copy of the config without the OpenAI API key"""
+    redacted = dict(config)
+    if isinstance(redacted.get('openai'), dict):
+        redacted['openai'] = {k: v for k, v in redacted['openai'].items() if k != 'api_key'}
+    return redacted
+
+# Encoders by format name: (PIL format, MIME type, save options)
+SCREENSHOT_FORMATS = {
+    # Fastest zlib level: a little larger, far quicker to encode
+    'png': ('PNG', 'image/png', {'compress_level': 1}),
+    # Lossy formats for live mode, where exact pixels don't matter
+    'webp': ('WEBP', 'image/webp', {'quality': 70, 'method': 1}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 70}),
+}
+
+def encode_screenshot(screenshot, fmt: str) -> bytes:
+    """Encode a PIL screenshot in one of SCREENSHOT_FORMATS; callers hold _screenshot_lock"""
+    pil_format, _, options = SCREENSHOT_FORMATS[fmt]
+    if pil_format == 'JPEG' and screenshot.mode not in ('RGB', 'L'):
+        screenshot = screenshot.convert('RGB')
+    buffer = _encode_buffer
+    buffer.seek(0)
+    buffer.truncate()
+    screenshot.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+# Base64 window for streamed data URIs; a multiple of 3 so no chunk but the last gets padding
+B64_WINDOW = 48 * 1024
+
+def stream_data_uri_json(payload: Dict):
+    """Yield a screenshot payload as JSON, base64-encoding the image window by window"""
+    image = memoryview(payload['image'])
+    yield f'{{"image": "data:{payload["mime"]};base64,'.encode('ascii')
+    for start in range(0, len(image), B64_WINDOW):
+        yield base64.b64encode(image[start:start + B64_WINDOW])
+    rest = {key: value for key, value in payload.items() if key != 'image'}
+    yield b'", ' + json.dumps(rest).encode('utf-8')[1:]
+
+def browser_supports_webp(user_agent: str) -> bool:
+    """Best guess from the User-Agent; Safari decodes WebP from version 14, IE never did"""
+    if 'Trident' in user_agent or 'MSIE' in user_agent:
+        return False
+    safari = re.search(r'Version/(\d+)[^ ]* .*Safari', user_agent)
+    if safari and 'Chrome' not in user_agent and 'Chromium' not in user_agent:
+        return int(safari.group(1)) >= 14
+    return True
+
+def downscale(screenshot, max_dim: int):
+    """Shrink a PIL screenshot so its longer side is at most max_dim"""
+    width, height = screenshot.size
+    scale = max_dim / max(width, height)
+    if scale >= 1:
+        return screenshot
+    return screenshot.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.BILINEAR)
+
+# Latest screenshot, shared by every client asking within SCREENSHOT_MAX_AGE;
+# each format and size is encoded at most once per capture
+SCREENSHOT_MAX_AGE = 1.0
+# Longest side of live mode frames; the dashboard shows them at 300px high
+LIVE_MAX_DIM = 1280
+LIVE_DIM_RANGE = (64, 7680)
+CAPTURE_TIMEOUT = 1.0
+_screenshot_cache = {'t': 0.0, 'screenshot': None, 'size': None, 'encoded': {}}
+_screenshot_lock = threading.Lock()
+# One capture thread: there's one framebuffer, and callers share the capture in flight
+_capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='capture')
+_capture_future: Optional[Future] = None
+# Encode buffer reused across encodes; only touched under _screenshot_lock
+_encode_buffer = io.BytesIO()
+
+def capture_screenshot() -> None:
+    """Capture a screenshot into the cache"""
+    screenshot = ai_controller.take_screenshot()
+    with _screenshot_lock:
+        _screenshot_cache.update(t=time.time(), screenshot=screenshot, size=list(screenshot.size),
+                                 encoded={})
+
+def get_screenshot_payload(max_age: float = SCREENSHOT_MAX_AGE, fmt: str = 'png',
+                           max_dim: Optional[int] = None) -> Dict:
+    """Encoded screenshot message no older than max_age, at most max_dim wide or high"""
+    global _capture_future
+
+    with _screenshot_lock:
+        cache = _screenshot_cache
+        future = None
+        if cache['screenshot'] is None or time.time() - cache['t'] >= max_age:
+            if _capture_future is None or _capture_future.done():
+                _capture_future = _capture_pool.submit(capture_screenshot)
+            future = _capture_future
+    if future is not None:
+        future.result(timeout=CAPTURE_TIMEOUT)
+
+    with _screenshot_lock:
+        key = (fmt, max_dim)
+        encoded = cache['encoded'].get(key)
+        if encoded is None:
+            screenshot = cache['screenshot']
+            if max_dim:
+                screenshot = downscale(screenshot, max_dim)
+            encoded = cache['encoded'][key] = encode_screenshot(screenshot, fmt)
+        return {
+            'image': encoded,
+            'mime': SCREENSHOT_FORMATS[fmt][1],
+            'timestamp': cache['t'],
+            'size': cache['size']
+        }
+
 @app.route('/')
 def index():
     """Main dashboard page"""
-    return render_template('dashboard.html')
+    # Static file: browsers cache it and revalidate with ETag/Last-Modified for a 304
+    return send_from_directory(app.template_folder, 'dashboard.html', max_age=3600)
+
+@ttl_cache(seconds=1.5)
+def build_status() -> Dict:
+    """Status snapshot shared by every client polling within the TTL"""
+    return {
+        'status': 'connected',
+        'is_running': _autonomous_running.is_set(),
+        'autonomous_mode': ai_controller.config["ai"]["autonomous_mode"],
+        'system_info': ai_controller.get_system_info(),
+        'interaction_count': ai_controller.interaction_count,
+        'last_screenshot_time': ai_controller.last_screenshot_time,
+        'config': public_config(ai_controller.config)
+    }
 
 @app.route('/api/status')
 def get_status():
@@ -59,16 +284,7 @@ def get_status():
         })
 
     try:
-        system_info = ai_controller.get_system_info()
-        return jsonify({
-            'status': 'connected',
-            'is_running': is_running,
-            'autonomous_mode': ai_controller.config["ai"]["autonomous_mode"],
-            'system_info': system_info,
-            'interaction_count': ai_controller.interaction_count,
-            'last_screenshot_time': ai_controller.last_screenshot_time,
-            'config': ai_controller.config
-        })
+        return cached_json(build_status(), max_age=1)
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -84,27 +300,27 @@ def get_screenshot():
         return jsonify({'error': 'AI Controller not initialized'})
 
     try:
-        # Take new screenshot
-        screenshot = ai_controller.take_screenshot()
+        # The data URI is base64-encoded while it's being sent, not all up front
+        return Response(stream_data_uri_json(get_screenshot_payload()), mimetype='application/json')
+    except Exception as e:
+        return jsonify({'error': str(e)})
 
-        # Convert to base64
-        import io
-        buffer = io.BytesIO()
-        screenshot.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+@app.route('/api/screenshot.png')
+def get_screenshot_png():
+    """Get latest screenshot as a PNG image"""
+    if not ai_controller:
+        return jsonify({'error': 'AI Controller not initialized'}), 503
 
-        return jsonify({
-            'image': f'data:image/png;base64,{img_str}',
-            'timestamp': time.time(),
-            'size': screenshot.size
-        })
+    try:
+        payload = get_screenshot_payload()
+        return Response(payload['image'], mimetype='image/png', headers={'Cache-Control': 'no-store'})
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/task', methods=['POST'])
 def execute_task():
     """Execute a specific task"""
-    global ai_controller
+    global ai_controller, _pending_tasks
 
     if not ai_controller:
         return jsonify({'error': 'AI Controller not initialized'})
@@ -115,19 +331,30 @@ def execute_task():
     if not task:
         return jsonify({'error': 'No task specified'})
 
-    try:
-        # Execute task in background thread
-        def run_task():
-            result = ai_controller.execute_ai_task(task)
-            socketio.emit('task_completed', {
-                'task': task,
-                'success': result,
-                'timestamp': datetime.now().isoformat()
-            })
+    with _pending_lock:
+        if _pending_tasks >= MAX_PENDING_TASKS:
+            return jsonify({'error': 'Too many tasks queued, try again later'}), 429
+        _pending_tasks += 1
+
+    def task_done(future: Future):
+        global _pending_tasks
+        with _pending_lock:
+            _pending_tasks -= 1
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Task error: {error}")
+            socketio.emit('error', {'message': str(error)})
+            return
+        socketio.emit('task_completed', {
+            'task': task,
+            'success': future.result(),
+            'timestamp': datetime.now().isoformat()
+        })
 
-        task_thread = threading.Thread(target=run_task)
-        task_thread.daemon = True
-        task_thread.start()
+    try:
+        # Execute task on the task pool
+        future = _task_pool.submit(ai_controller.execute_ai_task, task)
+        future.add_done_callback(task_done)
 
         return jsonify({
             'status': 'started',
@@ -135,12 +362,14 @@ def execute_task():
             'message': 'Task execution started in background'
         })
     except Exception as e:
+        with _pending_lock:
+            _pending_tasks -= 1
         return jsonify({'error': str(e)})
 
 @app.route('/api/autonomous', methods=['POST'])
 def toggle_autonomous():
     """Start/stop autonomous mode"""
-    global ai_controller, controller_thread, is_running
+    global ai_controller, controller_thread, _autonomous_generation
 
     if not ai_controller:
         return jsonify({'error': 'AI Controller not initialized'})
@@ -149,49 +378,88 @@ def toggle_autonomous():
     enable = data.get('enable', False)
 
     try:
-        if enable and not is_running:
-            # Start autonomous mode
-            is_running = True
-            ai_controller.is_running = True
-
-            def autonomous_worker():
-                try:
-                    ai_controller.start_autonomous_mode()
-                except Exception as e:
-                    logger.error(f"Autonomous mode error: {e}")
-                    socketio.emit('error', {'message': str(e)})
-                finally:
-                    global is_running
-                    is_running = False
-
-            controller_thread = threading.Thread(target=autonomous_worker)
-            controller_thread.daemon = True
-            controller_thread.start()
-
-            return jsonify({
-                'status': 'started',
-                'autonomous_mode': True
-            })
-
-        elif not enable and is_running:
-            # Stop autonomous mode
-            is_running = False
-            if ai_controller:
+        with _autonomous_toggle_lock:
+            if enable and not _autonomous_running.is_set():
+                # The previous worker shares ai_controller.is_running; let it finish first
+                previous = controller_thread
+                if previous is not None and not previous.done():
+                    ai_controller.stop()
+                    _, pending = wait([previous], timeout=AUTONOMOUS_STOP_TIMEOUT)
+                    if pending:
+                        return jsonify({'error': 'Previous autonomous run is still stopping'})
+
+                with _autonomous_lock:
+                    _autonomous_generation += 1
+                    generation = _autonomous_generation
+                    _autonomous_running.set()
+                ai_controller.is_running = True
+
+                def autonomous_worker():
+                    try:
+                        ai_controller.start_autonomous_mode()
+                    except Exception as e:
+                        logger.error(f"Autonomous mode error: {e}")
+                        socketio.emit('error', {'message': str(e)})
+                    finally:
+                        with _autonomous_lock:
+                            if _autonomous_generation == generation:
+                                _autonomous_running.clear()
+
+                controller_thread = _task_pool.submit(autonomous_worker)
+
+                return jsonify({
+                    'status': 'started',
+                    'autonomous_mode': True
+                })
+
+            elif not enable and _autonomous_running.is_set():
+                # Stop autonomous mode
+                with _autonomous_lock:
+                    _autonomous_running.clear()
                 ai_controller.stop()
 
-            return jsonify({
-                'status': 'stopped',
-                'autonomous_mode': False
-            })
+                return jsonify({
+                    'status': 'stopped',
+                    'autonomous_mode': False
+                })
 
         return jsonify({
             'status': 'no_change',
-            'autonomous_mode': is_running
+            'autonomous_mode': _autonomous_running.is_set()
         })
 
     except Exception as e:
         return jsonify({'error': str(e)})
 
+# Config saves run one at a time, in the order they were made
+_config_lock = threading.Lock()
+_config_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='config-writer')
+
+def config_bytes(config: Dict) -> bytes:
+    """Serialize the config the way config.json is written"""
+    if orjson is not None:
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    return json.dumps(config, indent=2).encode('utf-8')
+
+def write_config(path: str, data: bytes) -> None:
+    """Replace the config file atomically, so readers never see a partial write"""
+    target = Path(path)
+    tmp = None
+    try:
+        # A unique temp name per save, in the same directory so os.replace stays atomic
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f'.{target.name}.', suffix='.tmp')
+        with open(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, target)
+    except OSError as e:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        logger.error(f"Failed to save config: {e}")
+        socketio.emit('error', {'message': f'Failed to save config: {e}'})
+
 @app.route('/api/config', methods=['GET', 'POST'])
 def handle_config():
     """Get or update configuration"""
@@ -209,13 +477,19 @@ def handle_config():
 
         try:
             new_config = request.get_json()
+            if not isinstance(new_config, dict):
+                return jsonify({'error': 'Config update must be a JSON object'})
 
-            # Update config
-            ai_controller.config.update(new_config)
+            from ai_desktop_controller import deep_merge
 
-            # Save to file
-            with open(ai_controller.config_path, 'w') as f:
-                json.dump(ai_controller.config, f, indent=2)
+            # Merge the update (clients may send only the keys they change) and snapshot it
+            with _config_lock:
+                deep_merge(ai_controller.config, new_config)
+                ai_controller.refresh_config_cache()
+                data = config_bytes(ai_controller.config)
+
+            # Save to file off the request thread
+            _config_writer.submit(write_config, ai_controller.config_path, data)
 
             return jsonify({
                 'status': 'updated',
@@ -235,6 +509,7 @@ def execute_action():
     data = request.get_json()
 
     try:
+        from ai_desktop_controller import DesktopAction
         action = DesktopAction(
             action_type=data.get('type', 'wait'),
             x=data.get('x'),
@@ -280,22 +555,34 @@ def analyze_screen():
     except Exception as e:
         return jsonify({'error': str(e)})
 
-@app.route('/logs')
-def view_logs():
-    """View log files"""
+def log_dir_mtime() -> Optional[float]:
+    try:
+        return os.stat('logs').st_mtime
+    except OSError:
+        return None
+
+@ttl_cache(seconds=5.0, key=log_dir_mtime)
+def scan_logs() -> List[Dict]:
+    """Log files, newest first; rescanned when logs/ changes or the TTL runs out"""
     log_dir = Path('logs')
     if not log_dir.exists():
-        return jsonify({'logs': []})
+        return []
 
     log_files = []
     for log_file in log_dir.glob('*.log'):
+        stat = log_file.stat()
         log_files.append({
             'name': log_file.name,
-            'size': log_file.stat().st_size,
-            'modified': datetime.fromtimestamp(log_file.stat().st_mtime).isoformat()
+            'size': stat.st_size,
+            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
         })
 
-    return jsonify({'logs': sorted(log_files, key=lambda x: x['modified'], reverse=True)})
+    return sorted(log_files, key=lambda x: x['modified'], reverse=True)
+
+@app.route('/logs')
+def view_logs():
+    """View log files"""
+    return cached_json({'logs': scan_logs()}, max_age=1)
 
 @app.route('/logs/<filename>')
 def get_log_file(filename):
@@ -308,6 +595,8 @@ def get_log_file(filename):
 def handle_connect():
     """Handle client connection"""
     clients.add(request.sid)
+    if browser_supports_webp(request.headers.get('User-Agent', '')):
+        _webp_clients.add(request.sid)
     logger.info(f"Client connected: {request.sid}")
     emit('connected', {'status': 'Connected to AI Desktop Controller'})
 
@@ -315,6 +604,9 @@ def handle_connect():
 def handle_disconnect():
     """Handle client disconnection"""
     clients.discard(request.sid)
+    _webp_clients.discard(request.sid)
+    with _live_lock:
+        _live_sessions.pop(request.sid, None)
     logger.info(f"Client disconnected: {request.sid}")
 
 @socketio.on('request_screenshot')
@@ -327,446 +619,103 @@ def handle_screenshot_request():
         return
 
     try:
-        screenshot = ai_controller.take_screenshot()
-
-        # Convert to base64
-        import io
-        buffer = io.BytesIO()
-        screenshot.save(buffer, format='PNG', quality=70)  # Lower quality for faster transfer
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-
-        emit('screenshot', {
-            'image': f'data:image/png;base64,{img_str}',
-            'timestamp': time.time(),
-            'size': screenshot.size
-        })
+        # Raw image bytes go out as a binary attachment, no base64 needed
+        emit('screenshot', get_screenshot_payload())
     except Exception as e:
         emit('error', {'message': str(e)})
 
 @socketio.on('live_mode')
 def handle_live_mode(data):
     """Handle live screenshot streaming"""
+    sid = request.sid
     enabled = data.get('enabled', False)
     interval = data.get('interval', 2)  # seconds
+    fmt = data.get('format', 'webp')
+    try:
+        max_dim = int(data.get('max_dim') or LIVE_MAX_DIM)
+    except (TypeError, ValueError):
+        max_dim = LIVE_MAX_DIM
+    max_dim = max(LIVE_DIM_RANGE[0], min(max_dim, LIVE_DIM_RANGE[1]))
+    if fmt not in SCREENSHOT_FORMATS or (fmt == 'webp' and sid not in _webp_clients):
+        fmt = 'png'
+
+    with _live_lock:
+        state = _live_sessions.get(sid)
+        if state is not None:
+            # A registered stream is still looping: it picks up the new settings on its
+            # next tick, including being switched back on before it noticed the stop
+            state.update(enabled=enabled, interval=interval, format=fmt, max_dim=max_dim)
+            return
+        if not enabled or not ai_controller:
+            return
+        state = _live_sessions[sid] = {'enabled': True, 'interval': interval, 'format': fmt, 'max_dim': max_dim}
+
+    def live_stream():
+        try:
+            while True:
+                with _live_lock:
+                    # Deregister in the same step as the stop check, so a toggle either
+                    # revives this loop or finds no session and starts a new one
+                    if _live_sessions.get(sid) is not state:
+                        return
+                    if not state['enabled']:
+                        del _live_sessions[sid]
+                        return
+                    interval = state['interval']
+                    fmt, max_dim = state['format'], state['max_dim']
+                payload = get_screenshot_payload(min(interval / 2, SCREENSHOT_MAX_AGE),
+                                                 fmt=fmt, max_dim=max_dim)
+                socketio.emit('screenshot', payload, to=sid)
+                socketio.sleep(interval)
+        except Exception as e:
+            logger.error(f"Live mode error: {e}")
+            socketio.emit('error', {'message': str(e)}, to=sid)
+        finally:
+            with _live_lock:
+                if _live_sessions.get(sid) is state:
+                    del _live_sessions[sid]
 
-    if enabled:
-        def live_stream():
-            while enabled and request.sid in clients:
-                try:
-                    handle_screenshot_request()
-                    socketio.sleep(interval)
-                except:
-                    break
-
-        socketio.start_background_task(live_stream)
-
-# Create templates directory and basic HTML
-def create_templates():
-    """Create template files if they don't exist"""
-    templates_dir = Path('templates')
-    templates_dir.mkdir(exist_ok=True)
-
-    dashboard_html = \"\"\"
-<!DOCTYPE html>
-<html lang=\"en\">
-<head>
-    <meta charset=\"UTF-8\">
-    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
-    <title>AI Desktop Controller</title>
-    <script src=\"https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.0/socket.io.js\"></script>
-    <script src=\"https://cdn.jsdelivr.net/npm/chart.js\"></script>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #f5f5f5; }
-        .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; }
-        .header h1 { font-size: 28px; margin-bottom: 5px; }
-        .header p { opacity: 0.9; }
-        .container { max-width: 1400px; margin: 0 auto; padding: 20px; }
-        .dashboard { display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin-bottom: 20px; }
-        .card { background: white; border-radius: 12px; padding: 20px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
-        .card h3 { margin-bottom: 15px; color: #333; }
-        .status { display: flex; align-items: center; gap: 10px; margin-bottom: 15px; }
-        .status-dot { width: 12px; height: 12px; border-radius: 50%; }
-        .status-dot.connected { background: #4CAF50; animation: pulse 2s infinite; }
-        .status-dot.disconnected { background: #f44336; }
-        @keyframes pulse { 0%, 100% { opacity: 1; } 50% { opacity: 0.5; } }
-        .controls { display: grid; grid-template-columns: repeat(auto-fit, minmax(120px, 1fr)); gap: 10px; margin: 15px 0; }
-        .btn { padding: 12px 16px; border: none; border-radius: 8px; cursor: pointer; font-weight: 500; transition: all 0.3s; }
-        .btn-primary { background: #667eea; color: white; }
-        .btn-primary:hover { background: #5a6fd8; transform: translateY(-1px); }
-        .btn-secondary { background: #f8f9fa; color: #495057; border: 1px solid #dee2e6; }
-        .btn-secondary:hover { background: #e9ecef; }
-        .btn-danger { background: #dc3545; color: white; }
-        .btn-danger:hover { background: #c82333; }
-        .screenshot-area { text-align: center; border: 2px dashed #ddd; border-radius: 8px; padding: 20px; margin: 15px 0; }
-        .screenshot-area img { max-width: 100%; max-height: 300px; border-radius: 4px; }
-        .log-area { background: #2c3e50; color: #ecf0f1; padding: 15px; border-radius: 8px; height: 300px; overflow-y: auto; font-family: monospace; font-size: 12px; }
-        .input-group { display: flex; gap: 10px; margin: 10px 0; }
-        .input-group input { flex: 1; padding: 10px; border: 1px solid #ddd; border-radius: 6px; }
-        .metrics { display: grid; grid-template-columns: repeat(4, 1fr); gap: 15px; margin: 20px 0; }
-        .metric { text-align: center; padding: 15px; background: white; border-radius: 8px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
-        .metric-value { font-size: 24px; font-weight: bold; color: #667eea; }
-        .metric-label { font-size: 12px; color: #666; margin-top: 5px; }
-        .full-width { grid-column: 1 / -1; }
-        .two-column { display: grid; grid-template-columns: 2fr 1fr; gap: 20px; }
-    </style>
-</head>
-<body>
-    <div class=\"header\">
-        <h1>🤖 AI Desktop Controller</h1>
-        <p>Real-time AI desktop automation and control</p>
-    </div>
-
-    <div class=\"container\">
-        <!-- Status and Metrics -->
-        <div class=\"metrics\">
-            <div class=\"metric\">
-                <div class=\"metric-value\" id=\"status-value\">--</div>
-                <div class=\"metric-label\">Status</div>
-            </div>
-            <div class=\"metric\">
-                <div class=\"metric-value\" id=\"actions-count\">0</div>
-                <div class=\"metric-label\">Actions Taken</div>
-            </div>
-            <div class=\"metric\">
-                <div class=\"metric-value\" id=\"uptime\">00:00:00</div>
-                <div class=\"metric-label\">Uptime</div>
-            </div>
-            <div class=\"metric\">
-                <div class=\"metric-value\" id=\"cpu-usage\">--%</div>
-                <div class=\"metric-label\">CPU Usage</div>
-            </div>
-        </div>
-
-        <!-- Main Dashboard -->
-        <div class=\"dashboard\">
-            <!-- Controls -->
-            <div class=\"card\">
-                <h3>🎮 AI Controls</h3>
-                <div class=\"status\">
-                    <div class=\"status-dot disconnected\" id=\"connection-status\"></div>
-                    <span id=\"status-text\">Disconnected</span>
-                </div>
-
-                <div class=\"controls\">
-                    <button class=\"btn btn-primary\" onclick=\"takeScreenshot()\">📸 Screenshot</button>
-                    <button class=\"btn btn-primary\" onclick=\"toggleAutonomous()\">🧠 Auto Mode</button>
-                    <button class=\"btn btn-secondary\" onclick=\"analyzeScreen()\">🔍 Analyze</button>
-                    <button class=\"btn btn-danger\" onclick=\"emergencyStop()\">🛑 Stop</button>
-                </div>
-
-                <div class=\"input-group\">
-                    <input type=\"text\" id=\"task-input\" placeholder=\"Enter AI task...\" />
-                    <button class=\"btn btn-primary\" onclick=\"executeTask()\">Execute</button>
-                </div>
-
-                <div class=\"input-group\">
-                    <input type=\"number\" id=\"click-x\" placeholder=\"X\" />
-                    <input type=\"number\" id=\"click-y\" placeholder=\"Y\" />
-                    <button class=\"btn btn-secondary\" onclick=\"clickAt()\">Click</button>
-                </div>
-            </div>
-
-            <!-- Screenshot Area -->
-            <div class=\"card\">
-                <h3>👁️ AI Vision</h3>
-                <div class=\"screenshot-area\" id=\"screenshot-area\">
-                    <p>No screenshot available</p>
-                    <button class=\"btn btn-secondary\" onclick=\"requestScreenshot()\">Take Screenshot</button>
-                </div>
-                <div class=\"controls\">
-                    <button class=\"btn btn-secondary\" onclick=\"toggleLiveMode()\">📹 Live Mode</button>
-                    <button class=\"btn btn-secondary\" onclick=\"refreshScreenshot()\">🔄 Refresh</button>
-                </div>
-            </div>
-        </div>
-
-        <!-- Activity Log -->
-        <div class=\"card full-width\">
-            <h3>📋 Activity Log</h3>
-            <div class=\"log-area\" id=\"activity-log\">
-                <div>AI Desktop Controller Web Interface loaded...</div>
-            </div>
-            <div style=\"margin-top: 10px;\">
-                <button class=\"btn btn-secondary\" onclick=\"clearLog()\">Clear Log</button>
-                <button class=\"btn btn-secondary\" onclick=\"exportLog()\">Export Log</button>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        // Socket.IO connection
-        const socket = io();
-        let isLiveMode = false;
-        let startTime = Date.now();
-
-        // DOM elements
-        const statusDot = document.getElementById('connection-status');
-        const statusText = document.getElementById('status-text');
-        const activityLog = document.getElementById('activity-log');
-        const screenshotArea = document.getElementById('screenshot-area');
-
-        // Socket event handlers
-        socket.on('connect', () => {
-            updateConnectionStatus(true);
-            log('Connected to AI Desktop Controller', 'success');
-            refreshStatus();
-        });
-
-        socket.on('disconnect', () => {
-            updateConnectionStatus(false);
-            log('Disconnected from AI Desktop Controller', 'error');
-        });
-
-        socket.on('screenshot', (data) => {
-            displayScreenshot(data.image, data.timestamp, data.size);
-        });
-
-        socket.on('task_completed', (data) => {
-            log(`Task completed: ${data.task} (Success: ${data.success})`, data.success ? 'success' : 'error');
-        });
-
-        socket.on('error', (data) => {
-            log(`Error: ${data.message}`, 'error');
-        });
-
-        // Utility functions
-        function updateConnectionStatus(connected) {
-            if (connected) {
-                statusDot.className = 'status-dot connected';
-                statusText.textContent = 'Connected';
-                document.getElementById('status-value').textContent = 'Online';
-            } else {
-                statusDot.className = 'status-dot disconnected';
-                statusText.textContent = 'Disconnected';
-                document.getElementById('status-value').textContent = 'Offline';
-            }
-        }
-
-        function log(message, type = 'info') {
-            const timestamp = new Date().toLocaleTimeString();
-            const logEntry = document.createElement('div');
-            logEntry.style.color = type === 'success' ? '#2ecc71' : type === 'error' ? '#e74c3c' : '#3498db';
-            logEntry.innerHTML = `[${timestamp}] ${message}`;
-            activityLog.appendChild(logEntry);
-            activityLog.scrollTop = activityLog.scrollHeight;
-        }
-
-        function displayScreenshot(imageData, timestamp, size) {
-            screenshotArea.innerHTML = `
-                <img src=\"${imageData}\" alt=\"Desktop Screenshot\" />
-                <p>Screenshot taken at ${new Date(timestamp * 1000).toLocaleTimeString()}</p>
-                <p>Size: ${size[0]}x${size[1]}</p>
-            `;
-        }
-
-        // API functions
-        async function refreshStatus() {
-            try {
-                const response = await fetch('/api/status');
-                const data = await response.json();
-                if (data.system_info) {
-                    document.getElementById('actions-count').textContent = data.interaction_count || 0;
-                    document.getElementById('cpu-usage').textContent = Math.round(data.system_info.cpu_percent || 0) + '%';
-                }
-            } catch (error) {
-                log(`Failed to refresh status: ${error.message}`, 'error');
-            }
-        }
-
-        async function executeTask() {
-            const task = document.getElementById('task-input').value;
-            if (!task) {
-                log('Please enter a task', 'error');
-                return;
-            }
-
-            try {
-                const response = await fetch('/api/task', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ task })
-                });
-                const data = await response.json();
-                if (data.error) {
-                    log(`Task error: ${data.error}`, 'error');
-                } else {
-                    log(`Task started: ${task}`, 'info');
-                    document.getElementById('task-input').value = '';
-                }
-            } catch (error) {
-                log(`Failed to execute task: ${error.message}`, 'error');
-            }
-        }
-
-        async function toggleAutonomous() {
-            try {
-                const response = await fetch('/api/autonomous', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ enable: true })
-                });
-                const data = await response.json();
-                log(`Autonomous mode: ${data.autonomous_mode ? 'started' : 'stopped'}`, 'info');
-            } catch (error) {
-                log(`Failed to toggle autonomous mode: ${error.message}`, 'error');
-            }
-        }
-
-        async function takeScreenshot() {
-            try {
-                const response = await fetch('/api/screenshot');
-                const data = await response.json();
-                if (data.error) {
-                    log(`Screenshot error: ${data.error}`, 'error');
-                } else {
-                    displayScreenshot(data.image, data.timestamp, data.size);
-                    log('Screenshot taken', 'success');
-                }
-            } catch (error) {
-                log(`Failed to take screenshot: ${error.message}`, 'error');
-            }
-        }
-
-        async function analyzeScreen() {
-            try {
-                const response = await fetch('/api/analyze', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ task: 'analyze the current desktop' })
-                });
-                const data = await response.json();
-                if (data.error) {
-                    log(`Analysis error: ${data.error}`, 'error');
-                } else {
-                    log(`AI Analysis: ${data.analysis.analysis || 'Analysis completed'}`, 'info');
-                    if (data.analysis.suggested_action) {
-                        log(`Suggested action: ${data.analysis.suggested_action.reasoning}`, 'info');
-                    }
-                }
-            } catch (error) {
-                log(`Failed to analyze screen: ${error.message}`, 'error');
-            }
-        }
-
-        async function clickAt() {
-            const x = parseInt(document.getElementById('click-x').value);
-            const y = parseInt(document.getElementById('click-y').value);
-
-            if (!x || !y) {
-                log('Please enter valid coordinates', 'error');
-                return;
-            }
-
-            try {
-                const response = await fetch('/api/action', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ type: 'click', x, y })
-                });
-                const data = await response.json();
-                if (data.error) {
-                    log(`Click error: ${data.error}`, 'error');
-                } else {
-                    log(`Clicked at (${x}, ${y})`, 'success');
-                }
-            } catch (error) {
-                log(`Failed to click: ${error.message}`, 'error');
-            }
-        }
-
-        function requestScreenshot() {
-            socket.emit('request_screenshot');
-        }
-
-        function toggleLiveMode() {
-            isLiveMode = !isLiveMode;
-            socket.emit('live_mode', { enabled: isLiveMode, interval: 2 });
-            log(`Live mode ${isLiveMode ? 'enabled' : 'disabled'}`, 'info');
-        }
-
-        function refreshScreenshot() {
-            takeScreenshot();
-        }
-
-        function emergencyStop() {
-            fetch('/api/autonomous', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ enable: false })
-            });
-            log('Emergency stop triggered', 'error');
-        }
-
-        function clearLog() {
-            activityLog.innerHTML = '';
-        }
-
-        function exportLog() {
-            const logText = activityLog.textContent;
-            const blob = new Blob([logText], { type: 'text/plain' });
-            const url = URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `ai_desktop_log_${new Date().toISOString()}.txt`;
-            a.click();
-        }
-
-        // Update uptime
-        setInterval(() => {
-            const uptimeSeconds = Math.floor((Date.now() - startTime) / 1000);
-            const hours = Math.floor(uptimeSeconds / 3600);
-            const minutes = Math.floor((uptimeSeconds % 3600) / 60);
-            const seconds = uptimeSeconds % 60;
-            document.getElementById('uptime').textContent =
-                `${hours.toString().padStart(2, '0')}:${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
-        }, 1000);
-
-        // Refresh status periodically
-        setInterval(refreshStatus, 5000);
-    </script>
-</body>
-</html>
-    \"\"\"
-
-    dashboard_path = templates_dir / 'dashboard.html'
-    if not dashboard_path.exists():
-        with open(dashboard_path, 'w') as f:
-            f.write(dashboard_html)
+    socketio.start_background_task(live_stream)
 
 def initialize_ai_controller():
-    \"\"\"Initialize the AI controller\"\"\"
+    """Initialize the AI controller"""
     global ai_controller
 
+    try:
+        from ai_desktop_controller import AIDesktopController
+    except ImportError as e:
+        logger.error(f"❌ Could not import ai_desktop_controller ({e}). Make sure it's in the same directory.")
+        return False
+
     try:
         ai_controller = AIDesktopController()
-        logger.info(\"✅ AI Desktop Controller initialized successfully\")
+        logger.info("✅ AI Desktop Controller initialized successfully")
         return True
     except Exception as e:
-        logger.error(f\"❌ Failed to initialize AI Controller: {e}\")
+        logger.error(f"❌ Failed to initialize AI Controller: {e}")
         return False
 
 def main():
-    \"\"\"Main entry point for web interface\"\"\"
+    """Main entry point for web interface"""
     import argparse
 
-    parser = argparse.ArgumentParser(description=\"AI Desktop Controller Web Interface\")
-    parser.add_argument(\"--host\", default=\"127.0.0.1\", help=\"Host to bind to\")
-    parser.add_argument(\"--port\", type=int, default=8080, help=\"Port to bind to\")
-    parser.add_argument(\"--debug\", action=\"store_true\", help=\"Enable debug mode\")
+    parser = argparse.ArgumentParser(description="AI Desktop Controller Web Interface")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
+    parser.add_argument("--port", type=int, default=8080, help="Port to bind to")
+    parser.add_argument("--debug", action="store_true", help="Enable debug mode")
     args = parser.parse_args()
 
-    # Create templates
-    create_templates()
+    # Setup logging for web interface
+    logging.basicConfig(level=logging.INFO)
 
     # Initialize AI controller
     if not initialize_ai_controller():
-        print(\"❌ Failed to initialize AI Controller. Check your config.json file.\")
+        print("❌ Failed to initialize AI Controller. Check your config.json file.")
         sys.exit(1)
 
-    print(\"🚀 Starting AI Desktop Controller Web Interface\")
-    print(f\"📱 Access the dashboard at: http://{args.host}:{args.port}\")
-    print(\"🛑 Press Ctrl+C to stop\")
+    print("🚀 Starting AI Desktop Controller Web Interface")
+    print(f"📱 Access the dashboard at: http://{args.host}:{args.port}")
+    print("🛑 Press Ctrl+C to stop")
 
     try:
         socketio.run(
@@ -777,12 +726,12 @@ def main():
             allow_unsafe_werkzeug=True
         )
     except KeyboardInterrupt:
-        print(\"\\n👋 Shutting down AI Desktop Controller Web Interface\")
+        print("\n👋 Shutting down AI Desktop Controller Web Interface")
         if ai_controller:
             ai_controller.stop()
     except Exception as e:
-        logger.error(f\"Web interface error: {e}\")
+        logger.error(f"Web interface error: {e}")
         sys.exit(1)
 
-if __name__ == \"__main__\":
+if __name__ == "__main__":
     main()
\ No newline at end of file